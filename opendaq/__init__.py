@@ -24,8 +24,13 @@ try:
     from .daq import DAQ, LedColor, ExpMode, Trigger
     from .models import Gains
     from .daq_model import CalibReg
+    from .trigger import SoftTrigger, TriggerCondition
+    from .pool import DAQPool
+    from .discovery import discover, find_port
 except ImportError:
     pass
 
 __version__ = '0.3.3'
-__all__ = ['DAQ', 'LedColor', 'ExpMode', 'Trigger', 'Gains', 'CalibReg']
+__all__ = ['DAQ', 'LedColor', 'ExpMode', 'Trigger', 'Gains', 'CalibReg',
+           'SoftTrigger', 'TriggerCondition', 'DAQPool', 'discover',
+           'find_port']
@@ -0,0 +1,409 @@
+#!/usr/bin/env python
+
+# Copyright 2016
+# Ingen10 Ingenieria SL
+#
+# This file is part of opendaq.
+#
+# opendaq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# opendaq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with opendaq.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Benchmarks of the protocol and conversion hot paths.
+
+Run them with ``python -m opendaq.bench``, which prints the results as
+JSON. Every benchmark reports the time per call (seconds) and the rate of
+items (bytes, samples...) processed per second.
+
+Runs can be stored (``--save DIR``) and compared against a baseline run
+(``--baseline FILE``, or ``--compare BASELINE CURRENT`` for two stored
+runs), flagging the benchmarks that got significantly slower.
+
+``--recording FILE`` adds a benchmark decoding the data read in a session
+recorded with :class:`.RecordingSerial`.
+"""
+
+from __future__ import print_function
+from __future__ import division
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+from functools import partial
+from timeit import default_timer
+import numpy as np
+from terminaltables import AsciiTable
+from . import __version__
+from .common import CMD, mkcmd, parse_command, crc, escape_bytes
+from .stream import StreamParser, stream_packet, ESCAPE_BYTES
+from .experiment import ExpMode, DAQStream
+from .models import ModelM
+from .replay import read_records, READ
+
+MIN_TIME = 0.05     # minimum duration of a repetition (seconds)
+THRESHOLD = 0.05    # smallest slowdown reported by compare()
+
+# one-sided 99% quantiles of the Student's t distribution, by degrees of
+# freedom
+T_TABLE = [(1, 31.82), (2, 6.965), (3, 4.541), (4, 3.747), (5, 3.365),
+           (6, 3.143), (7, 2.998), (8, 2.896), (9, 2.821), (10, 2.764),
+           (15, 2.602), (20, 2.528), (30, 2.457), (60, 2.390)]
+T_INF = 2.326
+
+_benchmarks = []
+
+
+def benchmark(f):
+    """Register a benchmark.
+
+    The function prepares the data and returns a tuple (func, items, unit):
+    the function to time, the number of items that it processes per call and
+    their unit.
+    """
+    _benchmarks.append(f)
+    return f
+
+
+def _packets(npackets=100, nsamples=30):
+    """Stream data of one DataChannel, as sent by the device."""
+    values = np.random.RandomState(0).randint(-2**15, 2**15, nsamples)
+    data = bytearray()
+    for _ in range(npackets):
+        data += stream_packet(1, values.tolist())
+    return data, npackets*nsamples
+
+
+@benchmark
+def bench_mkcmd():
+    return lambda: mkcmd(CMD.PIO, 'BB', 1, 1), 1, 'commands'
+
+
+@benchmark
+def bench_parse_command():
+    reply = mkcmd(CMD.PIO, 'BB', 1, 1)
+    return lambda: parse_command(reply, '!BBBB', 6), 1, 'responses'
+
+
+@benchmark
+def bench_crc():
+    data = bytearray(range(64))
+    return lambda: crc(data), len(data), 'bytes'
+
+
+@benchmark
+def bench_escape_bytes():
+    data = bytearray(range(256))*4
+    return lambda: escape_bytes(data, ESCAPE_BYTES), len(data), 'bytes'
+
+
+@benchmark
+def bench_stream_decode():
+    data, nsamples = _packets()
+    return lambda: StreamParser().feed(data), nsamples, 'samples'
+
+
+@benchmark
+def bench_raw_to_volts():
+    model = ModelM(140, 1)
+    raw = tuple(range(-500, 500))
+    return lambda: model.raw_to_volts(raw, 1, 1), len(raw), 'samples'
+
+
+@benchmark
+def bench_raw_to_volts_array():
+    model = ModelM(140, 1)
+    raw = np.arange(-5000, 5000)
+    return lambda: model.raw_to_volts(raw, 1, 1), len(raw), 'samples'
+
+
+@benchmark
+def bench_volts_to_raw():
+    model = ModelM(140, 1)
+    volts = np.linspace(-4, 4, 10000)
+    return lambda: model.volts_to_raw(volts, 0), len(volts), 'samples'
+
+
+@benchmark
+def bench_add_points_read():
+    exp = DAQStream(ExpMode.ANALOG_IN, 1, 10, buffersize=20000)
+    points = [0.5]*1000
+
+    def run():
+        for _ in range(10):
+            exp.add_points(points)
+        exp.read()
+    return run, 10*len(points), 'samples'
+
+
+@benchmark
+def bench_stream_throughput():
+    # the path of DAQ.feed_stream(): decode, convert and store
+    data, nsamples = _packets()
+    model = ModelM(140, 1)
+    exp = DAQStream(ExpMode.ANALOG_IN, 1, 10, buffersize=20000)
+
+    def run():
+        for ch, values in StreamParser().feed(data):
+            exp.add_points(model.raw_to_volts(values, *exp.get_params()))
+        exp.read()
+    return run, nsamples, 'samples'
+
+
+@benchmark
+def bench_sim_streaming():
+    # the whole stream path, from a virtual-clock simulator
+    from .daq import DAQ
+    daq = DAQ('sim', virtual_clock=True)
+    nsamples = 10000
+
+    def run():
+        daq.clear_experiments()
+        s = daq.create_stream(ExpMode.ANALOG_IN, 1, npoints=nsamples,
+                              buffersize=nsamples)
+        s.analog_setup(gain=0)
+        daq.start(check=None)
+        while daq.is_measuring:
+            s.read()
+            time.sleep(0.001)
+        daq.stop()
+    return run, nsamples, 'samples'
+
+
+def bench_recording(path):
+    """Decoding of all the data read in a recorded session."""
+    data = bytearray().join(d for kind, _, d in read_records(path)
+                            if kind == READ)
+    return lambda: StreamParser().feed(data), len(data), 'bytes'
+
+
+def measure(func, number=None, repeat=5):
+    """Time a function.
+
+    :param func: Function to time.
+    :param number: Calls per repetition (default: enough calls to last
+        MIN_TIME).
+    :param repeat: Number of repetitions.
+    :returns: Number of calls per repetition, and list with the average
+        time per call of every repetition.
+    """
+    if number is None:
+        number = 1
+        while True:
+            t0 = default_timer()
+            for _ in range(number):
+                func()
+            if default_timer() - t0 >= MIN_TIME:
+                break
+            number *= 10
+
+    times = []
+    for _ in range(repeat):
+        t0 = default_timer()
+        for _ in range(number):
+            func()
+        times.append((default_timer() - t0)/number)
+    return number, times
+
+
+def run(names=None, number=None, repeat=5, recording=None):
+    """Run the benchmarks.
+
+    :param names: Only run the benchmarks whose name contains one of these
+        strings (default: all of them).
+    :param number: Calls per repetition (default: automatic).
+    :param repeat: Number of repetitions.
+    :param recording: Path of a recorded session, to benchmark its decoding
+        too.
+    :returns: Dictionary of results by benchmark name.
+    """
+    benchmarks = list(_benchmarks)
+    if recording:
+        benchmarks.append(partial(bench_recording, recording))
+
+    results = {}
+    for f in benchmarks:
+        name = getattr(f, 'func', f).__name__[len('bench_'):]
+        if names and not any(n in name for n in names):
+            continue
+
+        func, items, unit = f()
+        n, times = measure(func, number, repeat)
+        best = min(times)
+        results[name] = {
+            'number': n,
+            'times': times,
+            'mean': float(np.mean(times)),
+            'stdev': float(np.std(times, ddof=1)) if len(times) > 1 else 0.,
+            'min': best,
+            'items': items,
+            'unit': unit,
+            'rate': items/best if best > 0 else float('inf'),
+        }
+    return results
+
+
+def host_info():
+    """Description of the host and the software versions of a run."""
+    return {
+        'opendaq': __version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'node': platform.node(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def save(results, directory):
+    """Store the results of a run as a JSON file.
+
+    :param results: Dictionary returned by :func:`run`.
+    :param directory: Directory of the results store.
+    :returns: Path of the new file, named after the library version and
+        the time of the run.
+    """
+    info = host_info()
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    path = os.path.join(directory, '%s-%s.json' % (
+        info['opendaq'], info['time'].replace(':', '')))
+    with open(path, 'w') as f:
+        json.dump({'info': info, 'results': results}, f, indent=2,
+                  sort_keys=True)
+    return path
+
+
+def load(path):
+    """Load a stored run.
+
+    :returns: The host information and the results of the run.
+    """
+    with open(path) as f:
+        doc = json.load(f)
+    return doc['info'], doc['results']
+
+
+def welch(a, b):
+    """Welch's t-test of two samples.
+
+    :returns: t statistic (positive when b has a greater mean) and degrees
+        of freedom.
+    """
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    va, vb = a.var(ddof=1)/len(a), b.var(ddof=1)/len(b)
+    if va + vb == 0:
+        diff = b.mean() - a.mean()
+        return (np.sign(diff)*np.inf if diff else 0.), np.inf
+    t = (b.mean() - a.mean())/np.sqrt(va + vb)
+    dof = (va + vb)**2/(va**2/(len(a) - 1) + vb**2/(len(b) - 1))
+    return float(t), float(dof)
+
+
+def t_critical(dof):
+    """One-sided 99% critical value of the t statistic (conservative)."""
+    if dof == np.inf:
+        return T_INF
+    ret = T_TABLE[0][1]
+    for n, t in T_TABLE:
+        if n <= dof:
+            ret = t
+    return ret if dof < 120 else T_INF
+
+
+def compare(baseline, current, threshold=THRESHOLD):
+    """Compare two runs, benchmark by benchmark.
+
+    A benchmark is flagged as slower when its mean time grew more than the
+    threshold and the difference is significant (Welch's t-test, 99%).
+
+    :param baseline: Results of the reference run.
+    :param current: Results of the run to check.
+    :param threshold: Smallest relative slowdown to report.
+    :returns: List of (name, baseline mean, current mean, relative change,
+        t statistic, status) tuples, status being 'slower', 'faster' or ''.
+    """
+    rows = []
+    for name in sorted(set(baseline) & set(current)):
+        a, b = baseline[name]['times'], current[name]['times']
+        change = np.mean(b)/np.mean(a) - 1
+        status = ''
+        if len(a) > 1 and len(b) > 1:
+            t, dof = welch(a, b)
+            if abs(t) > t_critical(dof) and abs(change) > threshold:
+                status = 'slower' if change > 0 else 'faster'
+        else:
+            t = float('nan')
+        rows.append((name, float(np.mean(a)), float(np.mean(b)),
+                     float(change), t, status))
+    return rows
+
+
+def comparison_table(rows):
+    table = [['Benchmark', 'Baseline', 'Current', 'Change', 't', '']]
+    for name, a, b, change, t, status in rows:
+        table.append([name, '%.3g s' % a, '%.3g s' % b,
+                      '%+.1f%%' % (100*change), '%.1f' % t, status])
+    return AsciiTable(table).table
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('names', nargs='*',
+                        help='run only the benchmarks matching these names')
+    parser.add_argument('-n', '--number', type=int,
+                        help='calls per repetition (default: automatic)')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='number of repetitions')
+    parser.add_argument('-o', '--output', help='write the JSON to a file')
+    parser.add_argument('--recording', metavar='FILE',
+                        help='benchmark the decoding of a recorded session')
+    parser.add_argument('--save', metavar='DIR',
+                        help='store the run in a results directory')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='compare the run against a stored one')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help='compare two stored runs, without running')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='smallest relative slowdown to report')
+    args = parser.parse_args(args)
+
+    if args.compare:
+        baseline, current = [load(path)[1] for path in args.compare]
+    else:
+        current = run(args.names, args.number, args.repeat,
+                      args.recording)
+        doc = {'info': host_info(), 'results': current}
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(doc, f, indent=2, sort_keys=True)
+        elif not args.baseline:
+            json.dump(doc, sys.stdout, indent=2, sort_keys=True)
+            print()
+        if args.save:
+            print('Results stored in', save(current, args.save),
+                  file=sys.stderr)
+        if not args.baseline:
+            return 0
+        baseline = load(args.baseline)[1]
+
+    rows = compare(baseline, current, args.threshold)
+    print(comparison_table(rows))
+    return 1 if any(row[5] == 'slower' for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -20,6 +20,60 @@
 
 import struct
 import array
+from enum import IntEnum
+
+BAUDS = 115200
+
+
+class CMD(IntEnum):
+    """Command numbers of the openDAQ protocol."""
+    AIN = 1
+    AIN_CFG = 2
+    PIO = 3
+    AIN_ALL = 4
+    PIO_DIR = 5
+    PORT = 7
+    PORT_DIR = 9
+    PWM_INIT = 10
+    PWM_STOP = 11
+    PWM_DUTY = 12
+    SET_DAC = 13
+    CAPTURE_INIT = 14
+    CAPTURE_STOP = 15
+    GET_CAPTURE = 16
+    WAIT_MS = 17
+    LED_W = 18
+    STREAM_CREATE = 19
+    EXTERNAL_CREATE = 20
+    BURST_CREATE = 21
+    CHANNEL_CFG = 22
+    SIGNAL_LOAD = 23
+    SET_ANALOG = 24
+    STREAM_DATA = 25
+    SPISW_CONFIG = 26
+    RESET = 27
+    SPISW_SETUP = 28
+    SPISW_TRANSFER = 29
+    EEPROM_WRITE = 30
+    EEPROM_READ = 31
+    CHANNEL_SETUP = 32
+    TRIGGER_SETUP = 33
+    GET_TRIGGER_MODE = 34
+    GET_STATE_CHANNEL = 35
+    GET_CALIB = 36
+    SET_CALIB = 37
+    RESET_CALIB = 38
+    ID_CONFIG = 39
+    COUNTER_INIT = 41
+    GET_COUNTER = 42
+    CHANNEL_FLUSH = 45
+    ENCODER_INIT = 50
+    ENCODER_STOP = 51
+    GET_ENCODER = 52
+    ENABLE_CRC = 55
+    CHANNEL_DESTROY = 57
+    STREAM_START = 64
+    STREAM_STOP = 80
 
 
 class CRCError(ValueError):
@@ -30,6 +84,14 @@ class LengthError(ValueError):
     pass
 
 
+class BandwidthError(ValueError):
+    pass
+
+
+class NAKError(IOError):
+    pass
+
+
 def crc(data):
     """Calculate the cyclic redundancy check of a data packet.
 
@@ -86,7 +148,7 @@ NAK = mkcmd(160, '')
 
 def parse_command(data, fmt, length):
     if data == NAK:
-        raise IOError("NAK response received")
+        raise NAKError("NAK response received")
 
     if len(data) != length:
         raise LengthError("Bad packet length %d (it should be %d)" %
@@ -23,67 +23,42 @@ from __future__ import division
 import time
 import struct
 import array
+import hashlib
+import warnings
 import serial
-from threading import Thread
+import numpy as np
+import multiprocessing
+from threading import Thread, Lock, Event, current_thread
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
 from enum import IntEnum
-from .common import check_stream_crc, mkcmd, parse_command, bytes2hex, escape_bytes
-from .common import LengthError, CRCError
+from .common import CMD, BAUDS, check_stream_crc, mkcmd, parse_command
+from .common import LengthError, CRCError, NAKError, BandwidthError
+from .stream import StreamParser
+from .dio import DIOTransaction
+from .poller import Poller
+from .shm import SharedRing
+from .stats import LinkStats
+from .planner import plan, sample_rate, PACKET_SAMPLES
+from .discovery import find_port, claim_port, release_port
+from .trace import PrintTracer
+from .replay import RecordingSerial
 from .experiment import Trigger, ExpMode, DAQStream, DAQBurst, DAQExternal
 from .simulator import DAQSimulator
 from .models import DAQModel
 
-BAUDS = 115200
 MAX_CHANNELS = 4
 MAX_BUFFER_LINE = 50
-
-class CMD(IntEnum):
-    AIN = 1
-    AIN_CFG = 2
-    PIO = 3
-    AIN_ALL = 4
-    PIO_DIR = 5
-    PORT = 7
-    PORT_DIR = 9
-    PWM_INIT = 10
-    PWM_STOP = 11
-    PWM_DUTY = 12
-    SET_DAC = 13
-    CAPTURE_INIT = 14
-    CAPTURE_STOP = 15
-    GET_CAPTURE = 16
-    WAIT_MS = 17
-    LED_W = 18
-    STREAM_CREATE = 19
-    EXTERNAL_CREATE = 20
-    BURST_CREATE = 21
-    CHANNEL_CFG = 22
-    SIGNAL_LOAD = 23
-    SET_ANALOG = 24
-    STREAM_DATA = 25
-    SPISW_CONFIG = 26
-    RESET = 27
-    SPISW_SETUP = 28
-    SPISW_TRANSFER = 29
-    EEPROM_WRITE = 30
-    EEPROM_READ = 31
-    CHANNEL_SETUP = 32
-    TRIGGER_SETUP = 33
-    GET_TRIGGER_MODE = 34
-    GET_STATE_CHANNEL = 35
-    GET_CALIB = 36
-    SET_CALIB = 37
-    RESET_CALIB = 38
-    ID_CONFIG = 39
-    COUNTER_INIT = 41
-    GET_COUNTER = 42
-    CHANNEL_FLUSH = 45
-    ENCODER_INIT = 50
-    ENCODER_STOP = 51
-    GET_ENCODER = 52
-    ENABLE_CRC = 55
-    CHANNEL_DESTROY = 57
-    STREAM_START = 64
-    STREAM_STOP = 80
+PIPELINE_SIZE = 512     # max bytes of commands written at once
+RING_SIZE = 2**16   # samples per shared ring, when reading in a process
+EEPROM_SIZE = 254
+EEPROM_BLOCK = 32   # max bytes per EEPROM command
+COMMAND_TIMEOUT = 1.    # seconds to wait for a response while streaming
+RECONNECT_TIME = 30.    # seconds trying to reopen a disconnected device
+RECONNECT_POLL = 1.     # seconds between reopen attempts
+DRAIN_TIME = 0.1    # seconds for the stream to drain after STREAM_STOP
+STOP_TIMEOUT = 2.   # seconds that stop() waits for the end of the stream
+BOOT_TIME = 2.  # seconds for the device to boot after opening the port
 
 
 class LedColor(IntEnum):
@@ -97,21 +72,63 @@ class LedColor(IntEnum):
 class DAQ(object):
     """This class represents an OpenDAQ device."""
 
-    def __init__(self, port, debug=False):
+    def __init__(self, port, debug=False, multiprocess=False, shadow=False,
+                 trace=None, record=None, retry=None, reconnect=False,
+                 stall_timeout=None, virtual_clock=False):
         """Class constructor
-        :param port: Serial port.
+        :param port: Serial port: its name, 'sim' for a simulated device, or
+            a serial-like object (such as a :class:`.ReplaySerial`).
         :param debug: Turn on serial echoing to sdout.
+        :param multiprocess: Read and decode the stream packets in a child
+            process, which stores them in shared-memory rings (POSIX only).
+        :param shadow: Keep track of the configuration of the device, so
+            configuration commands are only sent when a setting changes.
+        :param trace: A :class:`.Tracer` receiving all the traffic with the
+            device (see :meth:`set_trace`). Overrides debug.
+        :param record: Path of a file where all the serial traffic is
+            recorded (see :class:`.RecordingSerial`).
+        :param retry: A :class:`.RetryPolicy` for the failed commands (see
+            :meth:`set_retry`).
+        :param reconnect: When the device is disconnected while the reader
+            thread is streaming, reopen it (looking for its serial number in
+            all the ports if needed), configure the experiments again and
+            restart them. The points lost meanwhile are recorded as a gap of
+            every experiment. Commands sent meanwhile fail with an IOError.
+        :param stall_timeout: Also handle as a disconnection when no byte is
+            received for this long while streaming (seconds). Experiments
+            waiting for a trigger send nothing, so it is disabled by default.
+        :param virtual_clock: Run a simulated device ('sim' port) on a
+            virtual clock, sending the stream as fast as it is read (see
+            :class:`.DAQSimulator`).
         """
         self.__port = port
-        self.__debug = debug
+        self.__record = record
+        self.__retry = retry
+        self.__reconnect = reconnect
+        self.__stall_timeout = stall_timeout
+        self.__trace = trace or (PrintTracer() if debug else None)
+        self.__multiprocess = multiprocess
+        self.__shadow = {} if shadow else None
         self.__simulate = (port == 'sim')
+        self.__virtual_clock = virtual_clock
 
         self.__measuring = False
+        self.__streaming = False    # the reader owns the serial input
+        self.__cmd_lock = Lock()
+        self.__pending = deque()    # commands sent while streaming
+        self.__reconnecting = None  # reader thread reopening the device
+        self.__parser = None
+        self.__stats = LinkStats()
         self.__gain = 0
         self.__pinput = 1
         self.__ninput = 0
         self.__exp = []     # list of experiments
         self.__thread = None
+        self.__exit = Event()   # tells the reader thread to exit
+        self.__frames = {}  # pending points of read_frames(), by experiment
+        self.__next_frame = 0
+        self.__frame_set = None     # experiments of read_frames()
+        self.__rings = {}   # shared rings by DataChannel (multiprocess mode)
 
         self.open()
 
@@ -124,44 +141,291 @@ class DAQ(object):
 
     def open(self):
         """Open the serial port."""
-        if self.__port == 'sim':
-            self.ser = DAQSimulator(self.__port, BAUDS, timeout=1)
+        self.__signal_hash = None   # last waveform loaded in the device
+        self.__eeprom = None    # EEPROM image: (data, valid) bytearrays
+        self.invalidate_shadow()
+        if hasattr(self.__port, 'read'):
+            self.ser = self.__port
+            if not getattr(self.ser, 'is_open', True):
+                self.ser.open()
+        elif self.__port == 'sim':
+            self.ser = DAQSimulator(self.__port, BAUDS, timeout=1,
+                                    virtual_clock=self.__virtual_clock)
         elif 'simavr' in self.__port:
             self.ser = serial.Serial(self.__port, BAUDS, timeout=10,
                                      rtscts=True, dsrdtr=True)
         else:
             self.ser = serial.Serial(self.__port, BAUDS, timeout=1)
+            claim_port(self.__port)
             self.ser.setRTS(0)
-            time.sleep(2)
+            time.sleep(BOOT_TIME)
+        if self.__record:
+            self.ser = RecordingSerial(self.ser, self.__record)
 
     def close(self):
         """Close the serial port."""
+        self.invalidate_shadow()
+        if self.__process_alive():
+            self.__thread.terminate()
+
+        self.__close_port()
+        self.__streaming = False
+        for s in self.__exp:
+            s.attach_ring(None)
+        for ring in self.__rings.values():
+            ring.close(unlink=True)
+        self.__rings = {}
+
+    def __close_port(self):
+        """Close the serial port, letting discovery probe it again."""
         self.ser.close()
+        if not hasattr(self.__port, 'read'):
+            release_port(self.__port)
 
     def send_command(self, command, ret_fmt=None):
         """Build a command packet, send it to the openDAQ and process the
         response.
 
+        Failed commands are resent as the retry policy allows (see
+        :meth:`set_retry`).
+
         :param command: Command string.
         :param ret_fmt: Payload format of the response using python 'struct'
             format characters. I ret_fmt is None, no response is expected.
         :returns: Command ID and arguments of the response.
         :raises: LengthError: The legth of the response is not the expected.
         """
-        self.ser.write(command)
-        if self.__debug:
-            print("SENT:", bytes2hex(command))
+        policy = self.__retry
+        if ret_fmt is None or policy is None or \
+                not policy.retries(command[2]):
+            return self.__send_command(command, ret_fmt)
+
+        deadline = time.time() + policy.deadline
+        attempt = 1
+        while True:
+            streaming = self.__streaming
+            try:
+                ret = self.__send_command(command, ret_fmt)
+                break
+            except (CRCError, LengthError, NAKError) as e:
+                delay = policy.delay(attempt)
+                # a response lost while streaming may still come, and be
+                # taken for the response of the retry
+                if attempt >= policy.attempts or \
+                        time.time() + delay > deadline or \
+                        (streaming and isinstance(e, LengthError)):
+                    if attempt > 1:
+                        self.__stats.retry_failures += 1
+                    raise
+
+            self.__stats.retries += 1
+            time.sleep(delay)
+            if not self.__streaming:
+                self.ser.flushInput()
+            attempt += 1
+        return ret
+
+    def __send_command(self, command, ret_fmt):
+        if ret_fmt is not None:
+            if self.__streaming:
+                return self.__wait(self.submit_command(command, ret_fmt))
+            if self.__process_alive():
+                raise IOError("Commands with a response can not be sent "
+                              "while streaming in multiprocess mode")
+
+        with self.__cmd_lock:
+            self.__write(command)
+            self.__stats.commands += 1
+        sent = time.time()
 
         if ret_fmt is None:
             return
 
+        return self.__read_response(ret_fmt, command[2], sent)
+
+    def submit_command(self, command, ret_fmt=None):
+        """Send a command without waiting for its response.
+
+        While streaming, the response is picked out of the incoming stream
+        by the reader (thread or :meth:`feed_stream`), which completes the
+        returned future. Otherwise, the command is sent synchronously.
+        Commands may be submitted from any thread.
+
+        :param command: Command string.
+        :param ret_fmt: Payload format of the response (see
+            :meth:`send_command`).
+        :returns: A ``concurrent.futures.Future`` with the command ID and
+            arguments of the response.
+        """
+        future = Future()
+        with self.__cmd_lock:
+            if self.__streaming:
+                if ret_fmt is not None:
+                    fmt = '!BB' + ret_fmt
+                    ret_len = 2 + struct.calcsize(fmt)
+                    self.__pending.append((future, fmt, ret_len, command[2],
+                                           time.time()))
+                    self.__parser.expect(ret_len)
+                self.__write(command)
+                self.__stats.commands += 1
+                if ret_fmt is None:
+                    future.set_result(None)
+                return future
+
+        try:
+            future.set_result(self.send_command(command, ret_fmt))
+        except (IOError, ValueError) as e:
+            future.set_exception(e)
+        return future
+
+    def __wait(self, future):
+        """Wait for the response of a command sent while streaming."""
+        try:
+            return future.result(COMMAND_TIMEOUT)
+        except FutureTimeout:
+            if not self.__forget(future):
+                return future.result(0)     # it has just arrived
+            raise LengthError("No response received while streaming")
+
+    def __forget(self, future):
+        """Stop waiting for the response of a command sent while streaming,
+        so the next responses go to their own commands.
+
+        :returns: False if the response has already been received.
+        """
+        with self.__cmd_lock:
+            for i, entry in enumerate(self.__pending):
+                if entry[0] is future:
+                    break
+            else:
+                return False
+
+            del self.__pending[i]
+            # responses already complete are still waiting in the parser
+            j = i - len(self.__parser.responses)
+            if j < 0:
+                del self.__parser.responses[i]
+            else:
+                self.__parser.cancel(j)
+            self.__stats.length_errors += 1
+            future.set_exception(LengthError("No response received"))
+            return True
+
+    def __write(self, data):
+        if self.__reconnecting not in (None, current_thread()):
+            raise IOError("Reconnecting to the device")
+        self.ser.write(data)
+        if self.__trace:
+            self.__trace.on_send(data)
+
+    def set_trace(self, tracer):
+        """Install the trace hooks.
+
+        :param tracer: A :class:`.Tracer` (e.g. a :class:`.TraceRing`), or
+            None to stop tracing.
+        """
+        self.__trace = tracer
+
+    def set_retry(self, policy):
+        """Set the retry policy of the commands.
+
+        :param policy: A :class:`.RetryPolicy`, or None to never retry.
+        """
+        self.__retry = policy
+
+    def __send_shadowed(self, key, command, ret_fmt):
+        """Send a configuration command, unless the shadow state says that
+        the device already has it.
+
+        :param key: Setting changed by the command.
+        :returns: The response of the command, or None if it was not sent.
+        """
+        if self.__shadow is None:
+            return self.send_command(command, ret_fmt)
+        if self.__shadow.get(key) == command:
+            return None
+
+        ret = self.send_command(command, ret_fmt)
+        self.__shadow[key] = command
+        return ret
+
+    def invalidate_shadow(self, *cmds):
+        """Forget the shadow state of the device.
+
+        :param cmds: Only forget the settings of these commands (default:
+            all of them).
+        """
+        if self.__shadow is None:
+            return
+        if not cmds:
+            self.__shadow.clear()
+        for key in list(self.__shadow):
+            if key[0] in cmds:
+                del self.__shadow[key]
+
+    def __read_response(self, ret_fmt, ncmd, sent):
+        """Read and parse the response of a command.
+
+        :param ncmd: Command number, for the statistics.
+        :param sent: Time when the command was sent.
+        """
         fmt = '!BB' + ret_fmt
         ret_len = 2 + struct.calcsize(fmt)
         ret = bytearray(self.ser.read(ret_len))
-        if self.__debug:
-            print("RECV:", bytes2hex(ret))
+        if self.__trace:
+            self.__trace.on_recv(ret)
+
+        return self.__parse_response(ret, fmt, ret_len, ncmd, sent)
+
+    def __parse_response(self, ret, fmt, ret_len, ncmd, sent):
+        """Parse the response of a command, updating the statistics."""
+        try:
+            ret = parse_command(ret, fmt, ret_len)
+        except (IOError, ValueError) as e:
+            self.__stats.command_error(e)
+            raise
+        self.__stats.command_done(ncmd, time.time() - sent)
+        return ret
 
-        return parse_command(ret, fmt, ret_len)
+    def send_commands(self, commands):
+        """Send a list of commands, pipelining them over the serial link.
+
+        Commands are written in blocks of up to PIPELINE_SIZE bytes, and
+        then all their responses are read, so the link turnaround is paid
+        once per block instead of once per command.
+
+        :param commands: List of (command, ret_fmt) tuples (see
+            :meth:`send_command`).
+        :returns: List with the response of every command.
+        :raises: LengthError: The legth of a response is not the expected.
+        """
+        if self.__streaming:
+            futures = [self.submit_command(*c) for c in commands]
+            return [self.__wait(f) for f in futures]
+
+        ret = []
+        i = 0
+        while i < len(commands):
+            block = bytearray(commands[i][0])
+            j = i + 1
+            while j < len(commands) and \
+                    len(block) + len(commands[j][0]) <= PIPELINE_SIZE:
+                block += commands[j][0]
+                j += 1
+
+            with self.__cmd_lock:
+                self.__write(block)
+                self.__stats.commands += j - i
+            sent = time.time()
+
+            for command, ret_fmt in commands[i:j]:
+                if ret_fmt is None:
+                    ret.append(None)
+                else:
+                    ret.append(self.__read_response(ret_fmt, command[2],
+                                                    sent))
+            i = j
+        return ret
 
     def enable_crc(self, on):
         """Enable/Disable the cyclic redundancy check.
@@ -217,6 +481,7 @@ class DAQ(object):
         :param regs: A list of CalibReg objects.
         :raises: ValueError, IndexError
         """
+        self.clear_eeprom_cache()   # calibration is stored in the EEPROM
         self.__model.write_dac_calib(regs, self.__write_calib_slot)
 
     def set_adc_calib(self, regs):
@@ -225,6 +490,7 @@ class DAQ(object):
         :param regs: A list of CalibReg objects.
         :raises: ValueError, IndexError
         """
+        self.clear_eeprom_cache()
         self.__model.write_adc_calib(regs, self.__write_calib_slot)
 
     def set_id(self, id):
@@ -236,6 +502,7 @@ class DAQ(object):
         if not 0 <= id < 1000:
             raise ValueError("id out of range")
 
+        self.clear_eeprom_cache()
         return self.send_command(mkcmd(CMD.ID_CONFIG, 'I', id), 'BBI')
 
     @property
@@ -256,28 +523,105 @@ class DAQ(object):
                 (self.__model.model_str, self.__model.fw_ver,
                  self.__model.serial_str))
 
+    def __eeprom_image(self):
+        """Return the cached EEPROM image of the device."""
+        if self.__eeprom is None:
+            self.__eeprom = (bytearray(EEPROM_SIZE), bytearray(EEPROM_SIZE))
+        return self.__eeprom
+
+    def clear_eeprom_cache(self):
+        """Forget the cached EEPROM image, e.g. if the EEPROM was written
+        by other means."""
+        self.__eeprom = None
+
+    def __check_eeprom_range(self, pos, length):
+        if not 0 <= pos < EEPROM_SIZE:
+            raise ValueError("pos out of range")
+        if not 1 <= length <= EEPROM_SIZE - pos:
+            raise ValueError("length out of range")
+
     def read_eeprom(self, pos):
         """Read a byte from the EEPROM.
 
-        :param val: value to write.
         :param pos: position in memory.
         :raises: ValueError
         """
-        if not 0 <= pos < 254:
-            raise ValueError("pos out of range")
-
-        return self.send_command(mkcmd(CMD.EEPROM_READ, 'BB', pos, 1), 'BBB')[2]
+        return self.read_eeprom_block(pos, 1)[0]
 
     def write_eeprom(self, pos, val):
         """Write a byte in the EEPROM.
 
-        :param id: id number of the device [000:999].
+        :param pos: position in memory.
+        :param val: value to write.
+        :returns: Position, length and value written.
         :raises: ValueError
         """
-        if not 0 <= pos < 254:
-            raise ValueError("pos out of range")
+        return self.write_eeprom_block(pos, [val])[0]
+
+    def read_eeprom_block(self, pos, length, cached=True):
+        """Read a block of bytes from the EEPROM.
 
-        return self.send_command(mkcmd(CMD.EEPROM_WRITE, 'BBB', pos, 1, val), 'BBB')
+        The EEPROM image of the device is cached, so only the bytes never
+        read (or written) before are requested to the device (see
+        :meth:`clear_eeprom_cache`). Larger blocks are split in pipelined
+        commands of EEPROM_BLOCK bytes.
+
+        :param pos: position in memory.
+        :param length: number of bytes.
+        :param cached: use the cached values, if available.
+        :returns: bytearray with the data.
+        :raises: ValueError
+        """
+        self.__check_eeprom_range(pos, length)
+        image, valid = self.__eeprom_image()
+
+        commands = []
+        i = pos
+        while i < pos + length:
+            if cached and valid[i]:
+                i += 1
+                continue
+            n = 1
+            while n < EEPROM_BLOCK and i + n < pos + length and \
+                    not (cached and valid[i + n]):
+                n += 1
+            commands.append((mkcmd(CMD.EEPROM_READ, 'BB', i, n),
+                             'BB%dB' % n))
+            i += n
+
+        for ret in self.send_commands(commands):
+            i, n = ret[:2]
+            image[i:i + n] = bytearray(ret[2:])
+            valid[i:i + n] = bytearray([1])*n
+
+        return image[pos:pos + length]
+
+    def write_eeprom_block(self, pos, data):
+        """Write a block of bytes in the EEPROM.
+
+        The cached EEPROM image is updated as well.
+
+        :param pos: position in memory.
+        :param data: bytes to write.
+        :returns: List with the response of every EEPROM_BLOCK bytes
+            written: position, length and values.
+        :raises: ValueError
+        """
+        data = bytearray(data)
+        self.__check_eeprom_range(pos, len(data))
+        image, valid = self.__eeprom_image()
+
+        commands = []
+        for i in range(0, len(data), EEPROM_BLOCK):
+            block = data[i:i + EEPROM_BLOCK]
+            commands.append((mkcmd(CMD.EEPROM_WRITE, 'BB%dB' % len(block),
+                                   pos + i, len(block), *block),
+                             'BB%dB' % len(block)))
+        ret = self.send_commands(commands)
+
+        image[pos:pos + len(data)] = data
+        valid[pos:pos + len(data)] = bytearray([1])*len(data)
+        return ret
 
     def set_dac(self, raw, number=1):
         """Set DAC output (raw value).
@@ -322,9 +666,10 @@ class DAQ(object):
         if self.__model.fw_ver < 120:
             raise Warning("Function not implemented in this FW. Try updating")
 
+        self.invalidate_shadow(CMD.AIN_CFG)
         values = self.send_command(mkcmd(CMD.AIN_ALL, 'BB', nsamples, gain), '8h')
         return [self.__model.raw_to_volts(v, gain, i, 0) for i, v in
-                enumerate(values)]
+                enumerate(values, 1)]
 
     def conf_adc(self, pinput=8, ninput=0, gain=0, nsamples=20):
         """Configure the analog-to-digital converter.
@@ -347,8 +692,62 @@ class DAQ(object):
         self.__pinput = pinput
         self.__ninput = ninput
 
-        self.send_command(mkcmd(CMD.AIN_CFG, 'BBBB', pinput, ninput,
-                                int(gain), nsamples), 'hBBBB')
+        self.__send_shadowed((CMD.AIN_CFG,),
+                             mkcmd(CMD.AIN_CFG, 'BBBB', pinput, ninput,
+                                   int(gain), nsamples), 'hBBBB')
+
+    def scan(self, inputs, gains=0, nsamples=20, repeat=1, period=None):
+        """Read a list of analog inputs in command-response mode.
+
+        The AIN_CFG and AIN commands of the whole scan list are pipelined,
+        so every scan costs a single link turnaround.
+
+        :param inputs: List of positive inputs, or (pinput, ninput) tuples.
+        :param gains: Analog gain of every input (or a single one for all).
+        :param nsamples: Number of samples per data point [0-255).
+        :param repeat: Number of scans.
+        :param period: Time between the start of consecutive scans
+            (seconds). None to repeat them as fast as possible.
+        :returns: Array of shape (repeat, len(inputs)) with the readings in
+            volts.
+        :raises: ValueError
+        """
+        inputs = [i if type(i) is tuple else (i, 0) for i in inputs]
+        if np.ndim(gains) == 0:
+            gains = [gains]*len(inputs)
+        if len(gains) != len(inputs):
+            raise ValueError("Invalid number of gains")
+        if not 0 <= nsamples < 256:
+            raise ValueError("samples number out of range")
+
+        commands = []
+        for (pinput, ninput), gain in zip(inputs, gains):
+            self.__model.check_adc_settings(pinput, ninput, int(gain))
+            commands.append((mkcmd(CMD.AIN_CFG, 'BBBB', pinput, ninput,
+                                   int(gain), nsamples), 'hBBBB'))
+            commands.append((mkcmd(CMD.AIN, ''), 'h'))
+
+        raw = np.empty((repeat, len(inputs)))
+        start = time.time()
+        for i in range(repeat):
+            if period is not None:
+                # absolute deadlines, so the timing does not drift
+                delay = start + i*period - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+            ret = self.send_commands(commands)
+            raw[i] = [r[0] for r in ret[1::2]]
+
+        # the ADC keeps the configuration of the last input
+        self.__pinput, self.__ninput = inputs[-1]
+        self.__gain = int(gains[-1])
+        if self.__shadow is not None:
+            self.__shadow[(CMD.AIN_CFG,)] = commands[-2][0]
+
+        for j, ((pinput, ninput), gain) in enumerate(zip(inputs, gains)):
+            raw[:, j] = self.__model.raw_to_volts(raw[:, j], int(gain),
+                                                  pinput, ninput)
+        return raw
 
     def set_led(self, color, number=1):
         """Choose LED status.
@@ -363,8 +762,8 @@ class DAQ(object):
         if not 1 <= number <= self.__model.nleds:
             raise ValueError("Invalid LED number")
 
-        self.send_command(mkcmd(CMD.LED_W, 'BB',
-                                color.value, number), 'BB')
+        self.__send_shadowed((CMD.LED_W, number),
+                             mkcmd(CMD.LED_W, 'BB', color.value, number), 'BB')
 
     def set_pio(self, number, value):
         """Write PIO output value.
@@ -406,8 +805,9 @@ class DAQ(object):
         if output not in [0, 1]:
             raise ValueError("PIO direction out of range")
 
-        self.send_command(mkcmd(CMD.PIO_DIR, 'BB', number,
-                                int(bool(output))), 'BB')
+        self.__send_shadowed((CMD.PIO_DIR, number),
+                             mkcmd(CMD.PIO_DIR, 'BB', number,
+                                   int(bool(output))), 'BB')
 
     def set_port(self, value):
         """Write all PIO values.
@@ -434,8 +834,16 @@ class DAQ(object):
         :raises: ValueError
         """
         self.__model.check_port(output)
+        self.invalidate_shadow(CMD.PIO_DIR)
         self.send_command(mkcmd(CMD.PORT_DIR, 'B', output), 'B')
 
+    def dio_transaction(self):
+        """Create a batch of digital I/O operations.
+
+        See the :class:`.DIOTransaction` class for more info.
+        """
+        return DIOTransaction(self, self.__model.npios)
+
     def spi_config(self, cpol, cpha):
         """Bit-Bang SPI configure (clock properties).
 
@@ -462,6 +870,8 @@ class DAQ(object):
         if not 1 <= sck <= 6 or not 1 <= mosi <= 6 or not 1 <= miso <= 6:
             raise ValueError("Invalid spisw_setup values")
 
+        # the SPI pins change their direction
+        self.invalidate_shadow(CMD.PIO_DIR)
         self.send_command(mkcmd(CMD.SPISW_SETUP, 'BBB', sck, mosi, miso), 'BBB')
 
     def spi_write(self, value, word=False):
@@ -480,12 +890,45 @@ class DAQ(object):
             ret = self.send_command(mkcmd(CMD.SPISW_TRANSFER, 'B', value), 'B')[0]
         return ret
 
+    def spi_transfer(self, data, word=False):
+        """Bit-bang SPI transfer (send+receive) of a whole buffer.
+
+        The SPISW_TRANSFER commands of all the bytes (or words) are
+        pipelined, instead of waiting for the response of every one.
+
+        :param data: Bytes to send (bytes, bytearray or list of integers).
+        :param word: Transfer 2-byte words (big endian), instead of bytes.
+        :returns:
+            - received: Bytes received (bytearray).
+            - rate: Achieved transfer rate (bytes per second).
+        :raises: ValueError
+        """
+        data = bytearray(data)
+        if word:
+            if len(data) % 2:
+                raise ValueError("Invalid data length")
+            values = struct.unpack('!%dH' % (len(data) // 2), data)
+        else:
+            values = data
+
+        fmt = 'H' if word else 'B'
+        commands = [(mkcmd(CMD.SPISW_TRANSFER, fmt, v), fmt) for v in values]
+
+        start = time.time()
+        ret = self.send_commands(commands)
+        elapsed = time.time() - start
+
+        received = bytearray(struct.pack('!%d%s' % (len(ret), fmt),
+                                         *[r[0] for r in ret]))
+        return received, len(data)/elapsed if elapsed > 0 else float('inf')
+
     def init_counter(self, edge):
         """Initialize the edge counter and configure which edge increments the
         count.
 
         :param edge: high-to-low (False) or low-to-high (True).
         """
+        self.invalidate_shadow(CMD.PIO_DIR)
         self.send_command(mkcmd(CMD.COUNTER_INIT, 'B', int(bool(edge))), 'B')[0]
 
     def get_counter(self, reset):
@@ -504,6 +947,7 @@ class DAQ(object):
         if not 0 <= period <= 2**32:
             raise ValueError("Period value out of range")
 
+        self.invalidate_shadow(CMD.PIO_DIR)
         self.send_command(mkcmd(CMD.CAPTURE_INIT, 'I', period), 'I')[0]
 
     def stop_capture(self):
@@ -534,6 +978,7 @@ class DAQ(object):
         if not 0 <= resolution <= 2**32:
             raise ValueError("resolution value out of range")
 
+        self.invalidate_shadow(CMD.PIO_DIR)
         self.send_command(mkcmd(CMD.ENCODER_INIT, 'I', resolution), 'I')[0]
 
     def get_encoder(self):
@@ -547,6 +992,34 @@ class DAQ(object):
         """Stop encoder"""
         self.send_command(mkcmd(CMD.ENCODER_STOP, ''), '')
 
+    def poller(self, source, rate, **kwargs):
+        """Create a fixed-rate poller of the counter, encoder or capture.
+
+        See the :class:`.Poller` class for more info.
+
+        :param source: 'counter', 'encoder' or 'capture'.
+        :param rate: Target rate (readings per second).
+        :param kwargs: Arguments of the reading function (``reset`` for
+            :meth:`get_counter`, ``mode`` for :meth:`get_capture`).
+        :raises: ValueError
+        """
+        if source == 'counter':
+            reset = kwargs.get('reset', False)
+
+            def read():
+                return self.get_counter(reset)
+        elif source == 'encoder':
+            read = self.get_encoder
+        elif source == 'capture':
+            mode = kwargs.get('mode', 2)
+
+            def read():
+                return self.get_capture(mode)[1]
+        else:
+            raise ValueError("Invalid source")
+
+        return Poller(read, rate)
+
     def init_pwm(self, duty, period):
         """Start PWM output with a given period and duty cycle.
 
@@ -561,6 +1034,7 @@ class DAQ(object):
         if not 0 <= period <= 65535:
             raise ValueError("period value out of range")
 
+        self.invalidate_shadow(CMD.PIO_DIR)
         self.send_command(mkcmd(CMD.PWM_INIT, 'HH', duty, period), 'HH')
 
     def stop_pwm(self):
@@ -585,7 +1059,9 @@ class DAQ(object):
         if 1 <= mode <= 6 and value not in [0, 1]:
             raise ValueError("Invalid value of digital trigger")
 
-        self.send_command(mkcmd(CMD.TRIGGER_SETUP, 'BBH', number, mode, value), 'BBH')
+        self.__send_shadowed((CMD.TRIGGER_SETUP, number),
+                             mkcmd(CMD.TRIGGER_SETUP, 'BBH', number, mode,
+                                   value), 'BBH')
 
     def trigger_mode(self, number):
         """Get the trigger mode of the DataChannel.
@@ -638,7 +1114,8 @@ class DAQ(object):
         if not 0 <= nsamples < 256:
             raise ValueError("samples number out of range")
 
-        return self.send_command(
+        return self.__send_shadowed(
+            (CMD.CHANNEL_CFG, number),
             mkcmd(CMD.CHANNEL_CFG, 'BBBBBB', number, mode.value, pinput,
                   ninput, int(gain), nsamples), 'BBBBBB')
 
@@ -659,8 +1136,10 @@ class DAQ(object):
         if not 0 <= npoints < 65536:
             raise ValueError("npoints out of range")
 
-        return self.send_command(mkcmd(CMD.CHANNEL_SETUP, 'BHb', number,
-                                       npoints, int(not continuous)), 'BHB')
+        return self.__send_shadowed((CMD.CHANNEL_SETUP, number),
+                                    mkcmd(CMD.CHANNEL_SETUP, 'BHb', number,
+                                          npoints, int(not continuous)),
+                                    'BHB')
 
     def remove_experiment(self, experiment):
         """Delete a single experiment.
@@ -715,6 +1194,11 @@ class DAQ(object):
         if not 1 <= number <= MAX_CHANNELS:
             raise ValueError("Invalid DataChannel number")
 
+        self.__signal_hash = None
+        if self.__shadow is not None:
+            for cmd in (CMD.STREAM_CREATE, CMD.CHANNEL_SETUP, CMD.CHANNEL_CFG,
+                        CMD.TRIGGER_SETUP):
+                self.__shadow.pop((cmd, number), None)
         return self.send_command(mkcmd(CMD.CHANNEL_DESTROY, 'B', number), 'B')[0]
 
     def create_stream(self, mode, *args, **kwargs):
@@ -758,7 +1242,9 @@ class DAQ(object):
         if not 1 <= period <= 65535:
             raise ValueError("Invalid period")
 
-        self.send_command(mkcmd(CMD.STREAM_CREATE, 'BH', number, period), 'BH')
+        self.__send_shadowed((CMD.STREAM_CREATE, number),
+                             mkcmd(CMD.STREAM_CREATE, 'BH', number, period),
+                             'BH')
 
     def create_external(self, mode, clock_input, *args, **kwargs):
         """Create External experiment.
@@ -798,7 +1284,9 @@ class DAQ(object):
         if edge not in [0, 1]:
             raise ValueError("Invalid edge")
 
-        return self.send_command(mkcmd(CMD.EXTERNAL_CREATE, 'BB', number, edge), 'BB')
+        return self.__send_shadowed((CMD.STREAM_CREATE, number),
+                                    mkcmd(CMD.EXTERNAL_CREATE, 'BB', number,
+                                          edge), 'BB')
 
     def create_burst(self, *args, **kwargs):
         """Create Burst experiment.
@@ -822,77 +1310,129 @@ class DAQ(object):
         if not 100 <= period <= 65535:
             raise ValueError("Invalid period")
 
-        return self.send_command(mkcmd(CMD.BURST_CREATE, 'H', period), 'H')
+        return self.__send_shadowed((CMD.STREAM_CREATE, 1),
+                                    mkcmd(CMD.BURST_CREATE, 'H', period), 'H')
 
     def __load_signal(self, data, offset=0):
         """Load an array of values in volts to preload DAC output.
 
+        The waveform is sent in blocks of MAX_BUFFER_LINE points, pipelining
+        all of them. Nothing is sent if the device already has the same
+        waveform.
+
         :raises: LengthError: Invalid dada length.
         """
         if not 1 <= len(data) <= 400:
             raise LengthError("Invalid data length")
 
         self.set_analog(data[0])
-        values = [self.__model.volts_to_raw(v, 0) for v in data]
-        return self.send_command(mkcmd(CMD.SIGNAL_LOAD, 'h%dh' % len(values),
-                                       offset, *values), 'Bh')
+        values = self.__model.volts_to_raw(np.asarray(data, dtype=float), 0)
+        signal_hash = hashlib.sha1(struct.pack('!h', offset) +
+                                   values.astype('>i2').tobytes()).digest()
+        if signal_hash == self.__signal_hash:
+            return
+
+        self.__signal_hash = None
+        commands = []
+        for i in range(0, len(values), MAX_BUFFER_LINE):
+            buff = values[i:i + MAX_BUFFER_LINE]
+            commands.append((mkcmd(CMD.SIGNAL_LOAD, 'h%dh' % len(buff),
+                                   offset + i, *buff), 'Bh'))
+        self.send_commands(commands)
+        self.__signal_hash = signal_hash
 
     def flush(self):
         """Flush internal buffers."""
         self.ser.flushInput()
 
-    def __read_stream_packet(self):
-        packet = bytearray(self.ser.read(5))
-        _, cmd, size, ch = struct.unpack('!HBBB', packet)
+    def __read_available(self):
+        """Read the bytes waiting in the serial port (at least one)."""
+        return self.ser.read(max(1, self.ser.in_waiting))
+
+    @property
+    def is_measuring(self):
+        """True if any experiment is going on."""
+        if self.__rings and not self.__process_alive():
+            self.__measuring = False
+        return self.__measuring
 
-        if cmd == CMD.STREAM_DATA:
-            body = bytearray(self.ser.read(size - 1))
-            body = escape_bytes(body, (0x7d, 0x7e))
+    def __process_alive(self):
+        """True if the stream is being read by a child process."""
+        return bool(self.__rings) and self.__thread is not None and \
+            self.__thread.is_alive()
 
-            if self.__debug:
-                print("STRM:", bytes2hex(packet), bytes2hex(body))
+    def plan_bandwidth(self, samples_per_packet=PACKET_SAMPLES):
+        """Estimate the link bandwidth needed by the experiments.
 
-            data = struct.unpack('!%dh' % ((size - 4)/2), body[3:])
-            return ch, data
-        elif cmd == CMD.STREAM_STOP:
-            if self.__debug:
-                print("STRM:", bytes2hex(packet))
-            return ch, None
-        else:
-            raise IOError("Invalid stream command: %d", cmd)
+        :param samples_per_packet: Samples carried by every stream packet
+            (see :func:`.planner.stream_rate`).
+        :returns: A :class:`.planner.Plan`, with the expected traffic, the
+            link load and feasible periods for the experiments.
+        """
+        return plan(self.__exp, BAUDS, samples_per_packet)
 
-    def __read_stream(self):
-        """Generator that reads and parses a stream packet at a time.
+    def __check_bandwidth(self, check):
+        """Warn or fail if the experiments would saturate the link."""
+        p = self.plan_bandwidth()
+        if not check or p.load <= 1:
+            return
 
-        :returns: (data, channel)
-            - channel: Assigned experiment number.
-            - data: Buffer for data points.
+        msg = ("The experiments need %d bytes/s, but the link only carries "
+               "%d bytes/s. Feasible periods by DataChannel: %s" %
+               (p.rate, p.capacity, p.periods))
+        if check == 'error':
+            raise BandwidthError(msg)
+        warnings.warn(msg, RuntimeWarning)
+
+    def start(self, reader=True, check='warn'):
+        """Start all available experiments.
+
+        :param reader: Start a thread reading the stream. If False, the bytes
+            received from the device must be passed to :meth:`feed_stream`
+            (see :class:`.DAQPool`).
+        :param check: What to do if the experiments would saturate the
+            serial link (see :meth:`plan_bandwidth`): 'warn', 'error' or
+            None (do not check).
+        :raises: BandwidthError
         """
-        while True:
-            # wait for a start byte
-            r = self.ser.read(1)
-            while len(r) == 0 or bytearray(r)[0] != 0x7e:
-                r = self.ser.read(1)
-                pass
+        if self.__thread and self.__thread.is_alive():
+            return
 
-            # read a packet
-            try:
-                yield self.__read_stream_packet()
-            except EOFError:
-                break
+        self.__check_bandwidth(check)
 
-    @property
-    def is_measuring(self):
-        """True if any experiment is going on."""
-        return self.__measuring
+        self.__setup_experiments(self.__exp)
+
+        # all the DataChannels start together: align the frame counters
+        self.__frames = dict((s, (s.total_points, 0, np.empty(0)))
+                             for s in self.__exp)
+        self.__next_frame = 0
+        self.__frame_set = None
+        self.__origins = dict((s, s.total_points) for s in self.__exp)
 
-    def start(self):
-        """Start all available experiments."""
-        if self.__thread and self.__thread.isAlive():
+        self.__measuring = True
+        if self.__multiprocess:
+            self.__start_process()
             return
 
-        # setup the openDAQ
-        for s in self.__exp:
+        self.__start_stream()
+        if not reader:
+            return
+
+        self.__exit.clear()
+        self.__thread = Thread(target=self.__run)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def __setup_experiments(self, experiments, npoints=None):
+        """Configure the DataChannels of some experiments in the device.
+
+        :param npoints: Number of points of every experiment (default: the
+            npoints of the experiment), by experiment.
+        """
+        # analog experiments reconfigure the ADC
+        self.invalidate_shadow(CMD.AIN_CFG)
+        npoints = npoints or {}
+        for s in experiments:
             if s.__class__ is DAQBurst:
                 self.__create_burst(s.period)
             elif s.__class__ is DAQStream:
@@ -900,59 +1440,449 @@ class DAQ(object):
             else:
                 self.__create_external(s.number, s.edge)
 
-            self.__setup_channel(s.number, s.npoints, s.continuous)
+            self.__setup_channel(s.number, npoints.get(s, s.npoints),
+                                 s.continuous)
             self.__conf_channel(s.number, s.mode, s.pinput,
                                 s.ninput, s.gain, s.nsamples)
             self.__trigger_setup(s.number, s.trg_mode, s.trg_value)
 
             if s.get_mode() == ExpMode.ANALOG_OUT:
                 data, offset = s.get_preload_data()
-                num_buffers = int(len(data) / MAX_BUFFER_LINE)
-                for i in range(num_buffers):
-                    init = i * MAX_BUFFER_LINE
-                    end = init + MAX_BUFFER_LINE
-                    buff = data[init:end]
-                    self.__load_signal(buff, init)
-                init = num_buffers * MAX_BUFFER_LINE
-                buff = data[init:]
-                if len(buff) > 0:
-                    self.__load_signal(buff, init)
+                if len(data) > 0:
+                    self.__load_signal(data)
                 break
 
-        self.__measuring = True
+    def __start_stream(self, stopped=()):
+        """Start streaming, with a new parser.
+
+        :param stopped: DataChannels that will not send data.
+        """
+        self.__parser = StreamParser()
+        self.__stopped = set(stopped)
         self.send_command(mkcmd(CMD.STREAM_START, ''), '')
-        self.__thread = Thread(target=self.__run)
+        self.__streaming = True
+
+    def __converter(self, params):
+        """Function converting the raw values of an experiment to volts.
+
+        :param params: Gain, pinput and ninput of the experiment.
+        """
+        def convert(raw):
+            return self.__model.raw_to_volts(raw, *params)
+        return convert
+
+    def __start_process(self):
+        """Start the experiments, reading the stream in a child process."""
+        old_rings, self.__rings = self.__rings, {}
+        for s in self.__exp:
+            ring = SharedRing(RING_SIZE)
+            s.attach_ring(ring, self.__converter(s.get_params()))
+            self.__rings[s.number] = ring
+
+        for ring in old_rings.values():
+            ring.close(unlink=True)
+
+        self.send_command(mkcmd(CMD.STREAM_START, ''), '')
+        ctx = multiprocessing.get_context('fork')
+        self.__thread = ctx.Process(target=_read_stream_process,
+                                    args=(self.ser, self.__rings))
         self.__thread.daemon = True
         self.__thread.start()
 
-    def stop(self, clear=False):
+    def stop(self, clear=False, timeout=STOP_TIMEOUT):
         """Stop all running experiments and exit threads.
 
+        The stream is read until every DataChannel has sent its stop packet,
+        or until the timeout expires. Then the reader is told to exit, so
+        stop() returns in a bounded time (the timeout, plus the read timeout
+        of the serial port) even if the device does not answer. In that
+        case, STREAM_STOP is sent again, the input is flushed and the shadow
+        state is forgotten, so the device can be used again.
+
         :param clear: If True, the experiment list will be cleared. The
         experiments will no longer be available.
+        :param timeout: Longest wait for the end of the stream (seconds), or
+            None to wait forever.
+        :returns: True if all the experiments stopped cleanly.
         """
-        if self.__thread and self.__thread.isAlive():
-            self.send_command(mkcmd(CMD.STREAM_STOP, ''))
-            self.__thread.join() # wait for thread to finish
+        clean = True
+        if self.__thread and self.__thread.is_alive():
+            self.__send_stop()
+            self.__thread.join(timeout)
+            clean = not self.__thread.is_alive()
+            if not clean:
+                if self.__rings:
+                    self.__thread.terminate()
+                self.__exit.set()
+                self.__thread.join(getattr(self.ser, 'timeout', None) or 0)
+                self.__abandon_stream()
 
             if clear:
                 self.clear_experiments()
+        elif self.__measuring:
+            # the stream is being read by feed_stream(), from another thread
+            self.__send_stop()
+            deadline = None if timeout is None else time.time() + timeout
+            while self.__streaming and \
+                    (deadline is None or time.time() < deadline):
+                time.sleep(DRAIN_TIME/10)
+            clean = not self.__streaming
+            if not clean:
+                self.__abandon_stream()
+        return clean
+
+    def __send_stop(self):
+        try:
+            self.send_command(mkcmd(CMD.STREAM_STOP, ''))
+        except (IOError, serial.SerialException):
+            pass    # the device is lost, the reader will give up on it
 
-    def __run(self):
-        """Thread loop.
+    def __abandon_stream(self):
+        """Give up a stream that did not stop in time, leaving the device
+        ready for new commands."""
+        self.__end_stream()
+        self.__measuring = False
+        try:
+            # the first STREAM_STOP may have been lost
+            self.__send_stop()
+            time.sleep(DRAIN_TIME)
+            self.ser.flushInput()
+        except (IOError, serial.SerialException):
+            pass    # the device is lost or its port closed
+        finally:
+            # the device may have missed some of the settings
+            self.invalidate_shadow()
+
+    def __end_stream(self, error=None):
+        """Give up the stream: the commands waiting for a response fail.
+
+        :param error: Exception set to the pending commands (default: a
+            LengthError).
+        """
+        with self.__cmd_lock:
+            for future, _, _, _, _ in self.__pending:
+                future.set_exception(error or
+                                     LengthError("No response received"))
+            self.__pending.clear()
+            self.__streaming = False
+
+    def read_frames(self, experiments=None):
+        """Read the points of several experiments as time-aligned frames.
+
+        The periods of the experiments must be integer multiples of the
+        shortest one, which is used as the common time base. Slower
+        experiments hold their last point until a new one is available.
+        Points are aligned using the sample counters of the experiments, so
+        points dropped by a full buffer are returned as NaN.
+
+        Frames are consumed: every call returns the frames following the
+        ones of the previous call, so all the calls after start() must use
+        the same experiments.
+
+        :param experiments: List of Stream or Burst input experiments
+            (default: all the input experiments).
+        :returns:
+            - t: Time of every frame (seconds since start()).
+            - frames: Array of points with one row per frame, and one column
+              per experiment.
+        :raises: ValueError
+        """
+        outputs = (ExpMode.ANALOG_OUT, ExpMode.DIGITAL_OUT)
+        if experiments is None:
+            exps = [e for e in self.__exp if e.get_mode() not in outputs]
+        else:
+            exps = experiments
+        if not exps or any(type(e) is DAQExternal for e in exps):
+            raise ValueError("Frames need Stream or Burst experiments")
+        if any(e.get_mode() in outputs for e in exps):
+            raise ValueError("Output experiments do not acquire points")
+
+        base = min(e.period for e in exps)
+        if any(e.period % base for e in exps):
+            raise ValueError("Periods must be multiples of the shortest one")
+        ratios = [e.period // base for e in exps]
+        if self.__frame_set is None:
+            self.__frame_set = list(exps)
+        elif self.__frame_set != list(exps):
+            raise ValueError("The frames of other experiments are being read")
+
+        # pending points of every experiment: (index of the first one
+        # relative to start(), points)
+        for e in exps:
+            if e not in self.__frames:
+                self.__frames[e] = (0, 0, np.empty(0))
+            origin, first, pending = self.__frames[e]
+
+            index, points = e.read_indexed()
+            index -= origin
+            end = first + len(pending)
+            if points:
+                gap = np.full(max(index - end, 0), np.nan)
+                points = np.asarray(points, dtype=float)[max(end - index, 0):]
+                pending = np.concatenate((pending, gap, points))
+            self.__frames[e] = origin, first, pending
+
+        # frame k holds point (k // ratio) of every experiment
+        k0 = self.__next_frame
+        k1 = min((self.__frames[e][1] + len(self.__frames[e][2]))*r
+                 for e, r in zip(exps, ratios))
+        k = np.arange(k0, max(k0, k1))
+
+        frames = np.empty((len(k), len(exps)))
+        for col, (e, r) in enumerate(zip(exps, ratios)):
+            origin, first, pending = self.__frames[e]
+            frames[:, col] = pending[k//r - first]
+
+            # forget the points that will not be used anymore
+            used = max((k0 + len(k))//r - first, 0)
+            self.__frames[e] = origin, first + used, pending[used:]
+
+        self.__next_frame = k0 + len(k)
+        unit = 1e-6 if type(exps[0]) is DAQBurst else 1e-3
+        return k*base*unit, frames
+
+    def feed_stream(self, data):
+        """Process the bytes received from the device while streaming.
 
         Store the experiment data sent by the device after calling start().
+
+        Responses to the commands sent meanwhile (see :meth:`submit_command`)
+        are picked out of the stream, and their futures completed.
+
+        :param data: Bytes read from the serial port.
+        :returns: False when all the experiments have finished, and all the
+            pending responses have arrived.
         """
-        used = self.__used_channels()
-        stopped = 0
+        if self.__trace and data:
+            self.__trace.on_stream_packet(data)
 
-        for ch, data in self.__read_stream():
-            if data is None:
-                stopped += 1
-                if stopped == len(used):
-                    break
+        used = self.__used_channels()
+        self.__stats.stream_bytes += len(data)
+        with self.__cmd_lock:
+            packets = self.__parser.feed(data)
+        for ch, values in packets:
+            if ch not in used:
+                continue
+            if values is None:
+                self.__stopped.add(ch)
+                if len(self.__stopped) >= len(used):
+                    self.__measuring = False
             else:
+                self.__stats.packet(ch, len(values))
                 exp = self.__exp[used.index(ch)]
-                exp.add_points(self.__model.raw_to_volts(data, *exp.get_params()))
+                exp.add_points(self.__model.raw_to_volts(values,
+                                                         *exp.get_params()))
+
+        with self.__cmd_lock:
+            while self.__parser.responses:
+                ret = self.__parser.responses.popleft()
+                future, fmt, ret_len, ncmd, sent = self.__pending.popleft()
+                try:
+                    future.set_result(self.__parse_response(ret, fmt, ret_len,
+                                                            ncmd, sent))
+                except (IOError, ValueError) as e:
+                    future.set_exception(e)
+
+            if not self.__measuring and self.__pending and \
+                    time.time() > self.__pending[0][4] + COMMAND_TIMEOUT:
+                for future, _, _, _, _ in self.__pending:
+                    self.__stats.length_errors += 1
+                    future.set_exception(LengthError("No response received"))
+                self.__pending.clear()
+
+            self.__streaming = self.__measuring or bool(self.__pending)
+            return self.__streaming
+
+    def stats(self):
+        """Statistics of the link with the device.
+
+        All the counters start at zero when the object is created (see
+        :meth:`reset_stats`).
+
+        :returns: Dictionary with:
+            - commands: Number of commands sent.
+            - naks, length_errors, crc_errors: Number of failed commands.
+            - retries: Number of commands resent, and retry_failures,
+              commands that failed after being resent.
+            - disconnects: Number of times that the device was lost while
+              streaming, and reconnects, times that it was recovered.
+            - latency: Round-trip time histogram of every command number
+              (see :class:`.LatencyHistogram`).
+            - stream_bytes: Bytes received while streaming.
+            - channel_bytes, channel_packets: Data bytes and packets
+              received for every DataChannel.
+            - parser_errors: Discarded stream packets.
+            - reader_busy: Time spent by the reader thread processing the
+              stream (seconds), and reader_load, as a fraction of its run
+              time.
+            - buffer_fill: Fill level (0 to 1) of the buffer of every
+              experiment, by DataChannel.
+        """
+        ret = self.__stats.as_dict()
+        ret['parser_errors'] = self.__parser.errors if self.__parser else 0
+        ret['buffer_fill'] = dict(
+            (s.number, len(s.ring_buffer)/s.ring_buffer.maxlen)
+            for s in self.__exp)
+        return ret
+
+    def reset_stats(self):
+        """Set all the statistics counters to zero."""
+        self.__stats.reset()
+        if self.__parser:
+            self.__parser.errors = 0
+
+    def __run(self):
+        """Thread loop.
+
+        Read the stream until all the experiments have finished.
+        """
+        t0 = last = time.time()
+        running = True
+        while running and not self.__exit.is_set():
+            try:
+                data = self.__read_available()
+                if not data and self.__stall_timeout and \
+                        time.time() - last > self.__stall_timeout:
+                    raise IOError("No data received for %g s" %
+                                  self.__stall_timeout)
+            except IOError as e:
+                running = self.__disconnected(e, last)
+                last = time.time()
+                continue
+
+            t1 = time.time()
+            if data:
+                last = t1
+            running = self.feed_stream(data)
+            t2 = time.time()
+            self.__stats.reader_busy += t2 - t1
+            self.__stats.reader_time = t2 - t0
+
+    def __disconnected(self, error, last):
+        """Handle the loss of the device while streaming.
+
+        :param error: Exception raised by the serial port.
+        :param last: Time when the last data was received.
+        :returns: True if the experiments were restarted.
+        """
+        self.__stats.disconnects += 1
+        if self.__reconnect:
+            # only the reader talks to the device until it is restarted
+            with self.__cmd_lock:
+                self.__reconnecting = current_thread()
+        self.__end_stream(IOError("Device disconnected"))
+
+        if self.__reconnect:
+            try:
+                self.__reopen()
+                self.__restart(time.time() - last)
+                self.__stats.reconnects += 1
+                return self.__measuring
+            except (IOError, ValueError) as e:
+                error = e
+            finally:
+                self.__reconnecting = None
+
+        self.__give_up(error)
+        return False
+
+    def abort_stream(self, error):
+        """Give up the stream of a device that was lost while its bytes
+        were passed to :meth:`feed_stream` (see :class:`.DAQPool`).
+
+        The experiments finish, and the commands waiting for a response
+        fail with an IOError.
+
+        :param error: Exception raised by the serial port.
+        """
+        self.__stats.disconnects += 1
+        self.__end_stream(IOError("Device disconnected"))
+        self.__give_up(error)
 
+    def __give_up(self, error):
+        """Finish the experiments of a lost device."""
         self.__measuring = False
+        warnings.warn("Device disconnected while streaming: %s" % error,
+                      RuntimeWarning)
+
+    def __reopen(self):
+        """Open again the port of the device, which may have changed.
+
+        :raises: IOError: The device was not found in RECONNECT_TIME.
+        """
+        try:
+            self.__close_port()
+        except IOError:
+            pass
+
+        serial_str = self.serial_str
+        deadline = time.time() + RECONNECT_TIME
+        while True:
+            if not hasattr(self.__port, 'read') and self.__port != 'sim':
+                self.__port = find_port(serial_str, confirm=True) or \
+                    self.__port
+            try:
+                self.open()
+                # the device may have kept streaming
+                self.send_command(mkcmd(CMD.STREAM_STOP, ''))
+                time.sleep(DRAIN_TIME)
+                self.ser.flushInput()
+                if DAQModel.new(*self.get_info()).serial_str == serial_str:
+                    return
+                self.__close_port()
+            except (IOError, ValueError):
+                try:
+                    self.__close_port()
+                except IOError:
+                    pass
+
+            if time.time() > deadline:
+                raise IOError("Device %s not found" % serial_str)
+            if self.__exit.wait(RECONNECT_POLL):
+                raise IOError("Stopped while reconnecting")
+
+    def __restart(self, elapsed):
+        """Configure and start again the experiments after a disconnection.
+
+        The points that the experiments would have acquired meanwhile are
+        recorded as gaps, and finite experiments only acquire the rest of
+        their points.
+
+        :param elapsed: Time without data (seconds).
+        """
+        npoints = {}
+        for s in self.__exp:
+            lost = int(elapsed*sample_rate(s))
+            if s.npoints and not s.continuous:
+                left = s.npoints - (s.total_points - self.__origins[s])
+                lost = min(lost, left)
+                npoints[s] = left - lost
+            if lost > 0:
+                s.add_gap(lost)
+
+        running = [s for s in self.__exp if npoints.get(s) != 0]
+        if not running:
+            self.__measuring = False
+            return
+
+        self.__setup_experiments(running, npoints)
+        self.__start_stream(s.number for s in self.__exp
+                            if s not in running)
+
+
+def _read_stream_process(ser, rings):
+    """Child process loop of the multiprocess mode.
+
+    Read and decode the stream packets, storing the raw values in the
+    shared ring of every DataChannel until all of them have stopped.
+    """
+    parser = StreamParser()
+    while not all(ring.stopped for ring in rings.values()):
+        data = ser.read(max(1, ser.in_waiting))
+        for ch, values in parser.feed(data):
+            if ch not in rings:
+                continue
+            if values is None:
+                rings[ch].stop()
+            else:
+                rings[ch].write(values)
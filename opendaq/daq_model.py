@@ -21,6 +21,7 @@
 
 from __future__ import division
 import time
+import numpy as np
 from collections import namedtuple
 from enum import IntEnum
 
@@ -84,12 +85,18 @@ class DAQModel(object):
             calibration values (gain and offset) of a slot, given its index.
         """
         time.sleep(.05)
+        self._set_dac_calib(read_slot)
+
+    def load_adc_calib(self, read_slot):
+        time.sleep(.05)
+        self._set_adc_calib(read_slot)
+
+    def _set_dac_calib(self, read_slot):
         for i in range(len(self.dac_calib)):
             gain, offset = read_slot(i)
             self.dac_calib[i] = CalibReg(1. + gain/2.**16, offset/2.**16)
 
-    def load_adc_calib(self, read_slot):
-        time.sleep(.05)
+    def _set_adc_calib(self, read_slot):
         for i in range(len(self.adc_calib)):
             gain, offset = read_slot(i + len(self.dac_calib))
             self.adc_calib[i] = CalibReg(1. + gain/2.**16, offset/2.**5)
@@ -161,7 +168,18 @@ class DAQModel(object):
         :param ninput: Negative input.
         :returns: Value in volts.
         """
-        # obtain the calibration gains and offsets
+        gain, offset = self.__adc_gain(gain_id, pinput, ninput)
+        if isinstance(raw, np.ndarray):
+            return np.round((raw - offset)/gain, 5)
+
+        try:
+            return [round((v - offset)/gain, 5) for v in raw]
+        except TypeError:
+            return round((raw - offset)/gain, 5)
+
+    def __adc_gain(self, gain_id, pinput, ninput):
+        """Gain and offset of the ADC conversion (raw = volts*gain + offset),
+        including the calibration."""
         slot1, slot2 = self._get_adc_slots(gain_id, pinput, ninput)
         gain1, offs1 = (1., 0.) if slot1 < 0 else self.adc_calib[slot1]
         gain2, offs2 = (1., 0.) if slot2 < 0 else self.adc_calib[slot2]
@@ -171,23 +189,50 @@ class DAQModel(object):
 
         gain = adc_gain*pga_gain*gain1*gain2
         offset = offs1 + offs2*pga_gain
+        return gain, offset
 
-        try:
-            return [round((v - offset)/gain, 5) for v in raw]
-        except TypeError:
-            return round((raw - offset)/gain, 5)
+    def volts_to_adc(self, volts, gain_id, pinput, ninput=0):
+        """Convert voltages to the raw values read by the ADC (the inverse
+        of :meth:`raw_to_volts`). Readings saturate at the ADC limits.
+
+        :param volts: Array of input voltages.
+        :param gain_id: ID of the analog configuration setup.
+        :param pinput: Positive input.
+        :param ninput: Negative input.
+        :returns: NumPy array of raw values.
+        """
+        gain, offset = self.__adc_gain(gain_id, pinput, ninput)
+        raw = np.round(np.asarray(volts, dtype=float)*gain + offset)
+        lim = 2**(self.adc.bits - 1)
+        return np.clip(raw, -lim, lim - 1).astype(int)
+
+    def dac_to_volts(self, raw, number):
+        """Convert raw DAC values to output voltages (the inverse of
+        :meth:`volts_to_raw`).
+
+        :param raw: Raw value or array of raw values.
+        :param number: Calibration slot of the DAC.
+        :returns: Voltage (or NumPy array of voltages).
+        """
+        gain, offset = self.dac_calib[number]
+        base_gain = self.dac.vmax/2**(self.dac.bits - 1)
+        return np.asarray(raw, dtype=float)*gain*base_gain + offset
 
     def __check_dac_value(self, volts):
-        if not (self.dac.vmin <= volts <= self.dac.vmax):
+        if np.ndim(volts):
+            if len(volts) and (np.min(volts) < self.dac.vmin or
+                               np.max(volts) > self.dac.vmax):
+                raise ValueError("DAC voltage out of range")
+        elif not (self.dac.vmin <= volts <= self.dac.vmax):
             raise ValueError("DAC voltage out of range")
 
     def volts_to_raw(self, volts, number):
-        """Convert a value in volts to a raw value.
+        """Convert a value or an array of values in volts to raw values.
         Device calibration values are used for the calculation.
 
-        :param volts: Value to convert to raw.
+        :param volts: Value or array of values to convert to raw.
         :param number: Calibration slot of the DAC.
-        :returns: Raw value.
+        :returns: Raw value (or NumPy array of raw values).
         :raises: ValueError: DAC voltage out of range
         """
         self.__check_dac_value(volts)
@@ -198,11 +243,17 @@ class DAQModel(object):
             raise IndexError('Invalid DAC number')
 
         base_gain = self.dac.vmax/2**(self.dac.bits - 1)
+        lo, hi = -1 << (self.dac.bits - 1), (1 << (self.dac.bits - 1)) - 1
+
+        if np.ndim(volts):
+            raw = np.round((np.asarray(volts, dtype=float) - offset) /
+                           (gain*base_gain))
+            return np.clip(raw, lo, hi).astype(int)
+
         raw = int(round((volts-offset)/(gain*base_gain)))
 
         # clamp value between DAC limits
-        return max(-1 << (self.dac.bits - 1),
-                   min(raw, (1 << (self.dac.bits - 1)) - 1))
+        return max(lo, min(raw, hi))
 
     @classmethod
     def new(cls, model_id, fw_ver, serial):
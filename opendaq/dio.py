@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+# Copyright 2016
+# Ingen10 Ingenieria SL
+#
+# This file is part of opendaq.
+#
+# opendaq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# opendaq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with opendaq.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import CMD, mkcmd
+
+MAX_WAIT = 255  # longest delay of a single WAIT_MS command (ms)
+
+
+class DIOTransaction(object):
+    """Batch of digital I/O operations sent at once.
+
+    Pin values and directions are accumulated and sent by :meth:`commit`:
+    when all the pins are set, a single PORT or PORT_DIR command is used;
+    otherwise the PIO/PIO_DIR commands are pipelined. Values are written
+    before directions, so outputs start with the requested level::
+
+        with daq.dio_transaction() as t:
+            t.set(1, 1)
+            t.set_dir(1, 1)
+
+    :param daq: A :class:`.DAQ` object.
+    :param npios: Number of PIOs of the device.
+    """
+    def __init__(self, daq, npios):
+        self.daq = daq
+        self.npios = npios
+        self.values = {}
+        self.dirs = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+
+    def __check(self, pin, value):
+        if not 1 <= pin <= self.npios:
+            raise ValueError("PIO number out of range")
+        if value not in (0, 1):
+            raise ValueError("digital value out of range")
+
+    def __check_port(self, value):
+        if not 0 <= value < 1 << self.npios:
+            raise ValueError("Port number out of range")
+
+    def set(self, pin, value):
+        """Set the value of a PIO (0: low, 1: high)."""
+        self.__check(pin, value)
+        self.values[pin] = int(value)
+
+    def set_dir(self, pin, output):
+        """Set the direction of a PIO (0: input, 1: output)."""
+        self.__check(pin, output)
+        self.dirs[pin] = int(output)
+
+    def set_port(self, value):
+        """Set the value of all the PIOs (bits: 0: low, 1: high)."""
+        self.__check_port(value)
+        self.values = dict((i + 1, (value >> i) & 1)
+                           for i in range(self.npios))
+
+    def set_port_dir(self, output):
+        """Set the direction of all the PIOs (bits: 0: input, 1: output)."""
+        self.__check_port(output)
+        self.dirs = dict((i + 1, (output >> i) & 1)
+                         for i in range(self.npios))
+
+    def __commands(self, pins, pin_cmd, port_cmd):
+        if len(pins) == self.npios:
+            port = sum(v << (pin - 1) for pin, v in pins.items())
+            return [(mkcmd(port_cmd, 'B', port), 'B')]
+        return [(mkcmd(pin_cmd, 'BB', pin, v), 'BB')
+                for pin, v in sorted(pins.items())]
+
+    def commit(self):
+        """Send the pending operations to the device."""
+        commands = (self.__commands(self.values, CMD.PIO, CMD.PORT) +
+                    self.__commands(self.dirs, CMD.PIO_DIR,
+                                    CMD.PORT_DIR))
+        if self.dirs:
+            self.daq.invalidate_shadow(CMD.PIO_DIR)
+        self.values = {}
+        self.dirs = {}
+        if commands:
+            self.daq.send_commands(commands)
+
+    def play(self, pattern, delay=1):
+        """Write a sequence of port values, timed by the device.
+
+        All the PORT writes and WAIT_MS delays are pipelined, so the timing
+        does not depend on the link latency.
+
+        :param pattern: List of port values (bits: 0: low, 1: high).
+        :param delay: Time between consecutive values (milliseconds).
+        :raises: ValueError
+        """
+        if delay < 0:
+            raise ValueError("Invalid delay")
+
+        waits = [MAX_WAIT]*(int(delay) // MAX_WAIT)
+        if delay % MAX_WAIT:
+            waits.append(int(delay) % MAX_WAIT)
+
+        commands = []
+        for i, value in enumerate(pattern):
+            self.__check_port(value)
+            if i:
+                commands += [(mkcmd(CMD.WAIT_MS, 'B', w), 'B') for w in waits]
+            commands.append((mkcmd(CMD.PORT, 'B', value), 'B'))
+        self.daq.send_commands(commands)
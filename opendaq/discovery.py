@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+
+# Copyright 2016
+# Ingen10 Ingenieria SL
+#
+# This file is part of opendaq.
+#
+# opendaq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# opendaq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with opendaq.  If not, see <http://www.gnu.org/licenses/>.
+
+import glob
+import time
+import struct
+import serial
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from .common import CMD, BAUDS, mkcmd, parse_command
+from .models import DAQModel
+
+PORT_PATTERNS = ['/dev/ttyUSB*', '/dev/ttyACM*']
+
+DeviceInfo = namedtuple('DeviceInfo', ['port', 'model_id', 'model_str',
+                                       'fw_ver', 'serial', 'serial_str'])
+
+# port -> DeviceInfo of the last probe (None: no device found)
+_cache = {}
+
+# ports opened by this process, never probed
+_in_use = set()
+
+
+def candidate_ports():
+    """Return the serial ports that may have an openDAQ attached."""
+    try:
+        from serial.tools.list_ports import comports
+        ports = [p.device for p in comports()]
+    except ImportError:
+        ports = []
+
+    if not ports:
+        for pattern in PORT_PATTERNS:
+            ports.extend(glob.glob(pattern))
+    return sorted(set(ports))
+
+
+def claim_port(port):
+    """Mark a serial port as opened by this process, so it is not probed
+    (probing would disturb the device using it)."""
+    _in_use.add(port)
+
+
+def release_port(port):
+    """Mark a serial port as no longer opened by this process."""
+    _in_use.discard(port)
+
+
+def probe(port, timeout=0.5, settle=2.):
+    """Ask a serial port for the identification of an openDAQ.
+
+    :param port: Serial port.
+    :param timeout: Response timeout (seconds).
+    :param settle: Time to wait after opening the port, for the device to
+        boot (seconds).
+    :returns: A :class:`DeviceInfo`, or None if there is no openDAQ.
+    """
+    fmt = '!BBBBI'
+    ret_len = 2 + struct.calcsize(fmt)
+    try:
+        ser = serial.Serial(port, BAUDS, timeout=timeout)
+        try:
+            ser.setRTS(0)
+            time.sleep(settle)
+            ser.flushInput()
+            ser.write(mkcmd(CMD.ID_CONFIG, ''))
+            model_id, fw_ver, serial_id = parse_command(
+                bytearray(ser.read(ret_len)), fmt, ret_len)
+        finally:
+            ser.close()
+        model = DAQModel.new(model_id, fw_ver, serial_id)
+    except (serial.SerialException, IOError, ValueError):
+        return None
+
+    return DeviceInfo(port, model_id, model.model_str, fw_ver, serial_id,
+                      model.serial_str)
+
+
+def discover(ports=None, refresh=False, **kwargs):
+    """Find the openDAQ devices attached to the serial ports.
+
+    The ports are probed concurrently, and the results are cached, so only
+    the ports never seen before are probed again (unless ``refresh`` is
+    True). The ports opened by this process are never probed: their cached
+    results, if any, are returned.
+
+    :param ports: List of ports to probe (default: all the candidate ports).
+    :param refresh: Probe the ports even if they are cached.
+    :param kwargs: Keyword arguments passed to :func:`probe`.
+    :returns: List of :class:`DeviceInfo`, one per device found.
+    """
+    if ports is None:
+        ports = candidate_ports()
+
+    pending = [p for p in ports
+               if (refresh or p not in _cache) and p not in _in_use]
+    if pending:
+        with ThreadPoolExecutor(max_workers=len(pending)) as ex:
+            _cache.update(zip(pending, ex.map(lambda p: probe(p, **kwargs),
+                                              pending)))
+
+    return [_cache[p] for p in ports if _cache.get(p) is not None]
+
+
+def find_port(serial_str, ports=None, confirm=False, **kwargs):
+    """Return the serial port of the device with a given serial number.
+
+    Cached results are tried first; all the ports are probed again only if
+    the device is not found.
+
+    :param serial_str: Serial number, as shown by :attr:`.DAQ.serial_str`.
+    :param ports: List of ports to probe (default: all the candidate ports).
+    :param confirm: Probe the cached port again before returning it, as the
+        device may have moved to another port. The ports opened by this
+        process are skipped.
+    :param kwargs: Keyword arguments passed to :func:`probe`.
+    :returns: Serial port, or None if the device is not found.
+    """
+    if ports is None:
+        ports = candidate_ports()
+    if confirm:
+        ports = [p for p in ports if p not in _in_use]
+
+    cached = [p for p in ports
+              if _cache.get(p) and _cache[p].serial_str == serial_str]
+    for info in discover(cached, refresh=confirm, **kwargs):
+        if info.serial_str == serial_str:
+            return info.port
+
+    rest = [p for p in ports if p not in cached]
+    for info in discover(rest, refresh=True, **kwargs):
+        if info.serial_str == serial_str:
+            return info.port
@@ -47,6 +47,10 @@ class Trigger(IntEnum):
 
 
 class DAQExperiment(object):
+    soft_trigger = None
+    shared_ring = None
+    total_points = 0    # points received since the experiment was created
+
     def analog_setup(self, pinput=1, ninput=0, gain=1, nsamples=20):
         """Configure a channel for a generic stream experiment.
         """
@@ -77,6 +81,32 @@ class DAQExperiment(object):
         self.trg_mode = mode
         self.trg_value = value
 
+    def set_soft_trigger(self, trigger):
+        """Evaluate a host-side trigger on every point of the experiment.
+
+        :param trigger: A :class:`.SoftTrigger` object (None to remove it).
+        """
+        self.soft_trigger = trigger
+
+    def attach_ring(self, ring, convert=None):
+        """Take the points from a shared ring filled by another process.
+
+        :param ring: A :class:`.SharedRing` object (None to detach it).
+        :param convert: Function converting raw values to volts.
+        """
+        if self.shared_ring is not None:
+            self.__pull_ring()
+        self.shared_ring = ring
+        self.ring_convert = convert
+
+    def __pull_ring(self):
+        """Move the samples of the shared ring into the ring buffer."""
+        lost, data = self.shared_ring.read()
+        if lost:
+            self.add_gap(lost)
+        if len(data):
+            self.add_points(self.ring_convert(data))
+
     def get_params(self):
         """Return gain, pinput and ninput."""
         return self.gain, self.pinput, self.ninput
@@ -100,16 +130,51 @@ class DAQExperiment(object):
         """Write a single point into the ring buffer."""
         self.mutex_ring_buffer.acquire()
         self.ring_buffer.extend(points)
+        self.total_points += len(points)
+        self.mutex_ring_buffer.release()
+
+        if self.soft_trigger is not None:
+            self.soft_trigger.process(points)
+
+    def add_gap(self, npoints):
+        """Account for points lost before reaching the ring buffer.
+
+        The gap is recorded in :attr:`gaps` as a tuple (index of the first
+        lost point, number of points).
+        """
+        self.mutex_ring_buffer.acquire()
+        self.gaps.append((self.total_points, npoints))
+        self.total_points += npoints
         self.mutex_ring_buffer.release()
 
     def read(self):
         """Return all available points from the ring buffer."""
+        if self.shared_ring is not None:
+            self.__pull_ring()
+
         self.mutex_ring_buffer.acquire()
         ret = list(self.ring_buffer)
         self.ring_buffer.clear()
         self.mutex_ring_buffer.release()
         return ret
 
+    def read_indexed(self):
+        """Return all available points from the ring buffer, together with
+        the sample index of the first one.
+
+        Points dropped because of a full ring buffer are accounted in the
+        index, so consecutive calls can be aligned exactly.
+        """
+        if self.shared_ring is not None:
+            self.__pull_ring()
+
+        self.mutex_ring_buffer.acquire()
+        ret = list(self.ring_buffer)
+        first = self.total_points - len(ret)
+        self.ring_buffer.clear()
+        self.mutex_ring_buffer.release()
+        return first, ret
+
 
 class DAQStream(DAQExperiment):
     """
@@ -153,6 +218,7 @@ class DAQStream(DAQExperiment):
 
         self.ring_buffer = deque(maxlen=buffersize)
         self.mutex_ring_buffer = Lock()
+        self.gaps = []
         self.analog_setup()
         self.trigger_setup()
 
@@ -199,6 +265,7 @@ class DAQExternal(DAQExperiment):
 
         self.ring_buffer = deque(maxlen=buffersize)
         self.mutex_ring_buffer = Lock()
+        self.gaps = []
         self.analog_setup()
         self.trigger_setup()
 
@@ -235,5 +302,6 @@ class DAQBurst(DAQExperiment):
 
         self.ring_buffer = deque(maxlen=buffersize)
         self.mutex_ring_buffer = Lock()
+        self.gaps = []
         self.analog_setup()
         self.trigger_setup()
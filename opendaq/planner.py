@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+# Copyright 2016
+# Ingen10 Ingenieria SL
+#
+# This file is part of opendaq.
+#
+# opendaq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# opendaq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with opendaq.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+import math
+from collections import namedtuple
+from .experiment import ExpMode, DAQStream, DAQBurst
+
+# start byte, checksum, command, size, channel and 3 reserved body bytes
+PACKET_OVERHEAD = 9
+# data bytes are escaped when they match one of the 2 escape codes
+ESCAPE_FACTOR = 1 + 2/256
+BITS_PER_BYTE = 10  # 8N1: start and stop bits
+PACKET_SAMPLES = 20     # samples carried by a full stream packet
+MARGIN = 0.9        # highest usable fraction of the link capacity
+BURST_BUFFER = 1600     # points that the device buffers in Burst mode
+
+
+Plan = namedtuple('Plan', 'rate capacity load periods')
+Plan.__doc__ = """Bandwidth plan of a set of experiments.
+
+- rate: Expected stream traffic (bytes per second).
+- capacity: Usable bandwidth of the link (bytes per second).
+- load: rate/capacity (above 1, samples will be lost).
+- periods: Feasible period of every experiment (by DataChannel number),
+  keeping their ratios, or the current ones if the plan fits.
+"""
+
+
+def sample_rate(exp):
+    """Samples per second sent by an experiment to the host (0 for output
+    experiments, or if it is not known, e.g. for External experiments)."""
+    if exp.mode in (ExpMode.ANALOG_OUT, ExpMode.DIGITAL_OUT):
+        return 0.
+    if type(exp) is DAQBurst:
+        return 1e6/exp.period
+    if type(exp) is DAQStream:
+        return 1e3/exp.period
+    return 0.
+
+
+def buffered(exp):
+    """True if all the points of an experiment fit in the buffer of the
+    device, so they are not lost whatever the link speed (finite Burst
+    experiments of up to BURST_BUFFER points)."""
+    return type(exp) is DAQBurst and not exp.continuous and \
+        0 < exp.npoints <= BURST_BUFFER
+
+
+def packet_bytes(nsamples):
+    """Expected size of a stream packet on the wire, including escaping."""
+    return PACKET_OVERHEAD + 2*nsamples*ESCAPE_FACTOR
+
+
+def stream_rate(experiments, samples_per_packet=PACKET_SAMPLES):
+    """Expected stream traffic of a set of experiments.
+
+    :param experiments: List of experiments.
+    :param samples_per_packet: Samples carried by every packet. The default
+        (full packets) is what the device sends when it is fast enough to
+        matter; 1 gives the worst case.
+    :returns: Bytes per second.
+    """
+    return sum(sample_rate(e)/samples_per_packet *
+               packet_bytes(samples_per_packet) for e in experiments)
+
+
+def plan(experiments, bauds, samples_per_packet=PACKET_SAMPLES,
+         margin=MARGIN):
+    """Check that the stream of a set of experiments fits in the link.
+
+    Experiments buffered by the device (see :func:`buffered`) always fit,
+    and are not counted.
+
+    :param experiments: List of experiments.
+    :param bauds: Baud rate of the serial link.
+    :param samples_per_packet: See :func:`stream_rate`.
+    :param margin: Highest usable fraction of the link capacity.
+    :returns: A :class:`Plan`.
+    """
+    rate = stream_rate([e for e in experiments if not buffered(e)],
+                       samples_per_packet)
+    capacity = margin*bauds/BITS_PER_BYTE
+    load = rate/capacity
+
+    periods = {}
+    for e in experiments:
+        period = e.period if hasattr(e, 'period') else None
+        if load > 1 and sample_rate(e) and not buffered(e):
+            period = min(int(math.ceil(e.period*load)), 65535)
+        periods[e.number] = period
+    return Plan(rate, capacity, load, periods)
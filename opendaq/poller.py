@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+# Copyright 2016
+# Ingen10 Ingenieria SL
+#
+# This file is part of opendaq.
+#
+# opendaq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# opendaq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with opendaq.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+import time
+import numpy as np
+
+
+class Poller(object):
+    """Call a reading function at a fixed rate.
+
+    Every reading is scheduled at an absolute deadline (``start + k/rate``),
+    so delays do not accumulate. The host time of every reading (midpoint
+    between request and response) and its value are stored in NumPy arrays.
+
+    :param read: Function returning a numeric value.
+    :param rate: Target rate (readings per second).
+    :raises: ValueError
+    """
+    def __init__(self, read, rate):
+        if not rate > 0:
+            raise ValueError("Invalid rate")
+
+        self.read = read
+        self.rate = rate
+        self.t = np.empty(0)
+        self.values = np.empty(0)
+        self.deadlines = np.empty(0)
+
+    def run(self, npoints):
+        """Take a number of readings.
+
+        :param npoints: Number of readings.
+        :returns:
+            - t: Host time of every reading (seconds).
+            - values: Array of readings.
+        """
+        self.t = np.empty(npoints)
+        self.values = np.empty(npoints)
+        self.deadlines = time.time() + np.arange(npoints)/self.rate
+
+        for i, deadline in enumerate(self.deadlines):
+            delay = deadline - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            t0 = time.time()
+            self.values[i] = self.read()
+            self.t[i] = (t0 + time.time())/2
+
+        return self.t, self.values
+
+    @property
+    def achieved_rate(self):
+        """Average rate of the last run (readings per second)."""
+        if len(self.t) < 2:
+            return 0.
+        return (len(self.t) - 1)/(self.t[-1] - self.t[0])
+
+    @property
+    def jitter(self):
+        """Standard deviation of the reading times around their deadlines
+        (seconds)."""
+        if not len(self.t):
+            return 0.
+        return float(np.std(self.t - self.deadlines))
+
+    def derivative(self, wrap=None):
+        """Rate of change of the readings (e.g. frequency from a counter,
+        or velocity from an encoder).
+
+        :param wrap: Modulus of the readings, to unwrap counter overflows
+            (e.g. 2**32 for the counter, or the encoder resolution).
+        :returns:
+            - t: Time between every pair of readings.
+            - rate: Change of the value per second.
+        """
+        dv = np.diff(self.values)
+        if wrap:
+            dv = (dv + wrap/2) % wrap - wrap/2
+        return (self.t[1:] + self.t[:-1])/2, dv/np.diff(self.t)
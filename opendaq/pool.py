@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+
+# Copyright 2016
+# Ingen10 Ingenieria SL
+#
+# This file is part of opendaq.
+#
+# opendaq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# opendaq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with opendaq.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
+from .daq import DAQ, STOP_TIMEOUT
+
+try:
+    import selectors
+except ImportError:
+    import selectors34 as selectors
+
+POLL_INTERVAL = 0.01    # seconds, for devices without a file descriptor
+
+
+class DAQPool(object):
+    """A group of openDAQ devices serviced by a single I/O thread.
+
+    Devices are opened (and their calibration read) concurrently. Once
+    started, the streams of all the devices are read from one
+    ``selectors``-based loop, instead of one reader thread per device.
+    Experiments are created on every device as usual::
+
+        pool = DAQPool(['/dev/ttyUSB0', '/dev/ttyUSB1'])
+        stream = pool['/dev/ttyUSB0'].create_stream(ExpMode.ANALOG_IN, 10)
+        pool.start()
+
+    :param ports: List of serial ports.
+    :param kwargs: Keyword arguments passed to every :class:`.DAQ`.
+    """
+    def __init__(self, ports, **kwargs):
+        self.ports = list(ports)
+        with ThreadPoolExecutor(max_workers=len(self.ports) or 1) as ex:
+            devices = list(ex.map(lambda p: DAQ(p, **kwargs), self.ports))
+
+        self.devices = devices
+        self.__thread = None
+
+    def __getitem__(self, port):
+        return self.devices[self.ports.index(port)]
+
+    def __iter__(self):
+        return iter(self.devices)
+
+    def __len__(self):
+        return len(self.ports)
+
+    @property
+    def is_measuring(self):
+        """True if any experiment of any device is going on."""
+        return any(daq.is_measuring for daq in self)
+
+    def start(self):
+        """Start the experiments of all the devices."""
+        if self.__thread and self.__thread.is_alive():
+            return
+
+        with ThreadPoolExecutor(max_workers=len(self.ports) or 1) as ex:
+            list(ex.map(lambda daq: daq.start(reader=False), self))
+
+        self.__thread = Thread(target=self.__run)
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """Stop the experiments of all the devices.
+
+        :param timeout: Longest wait for the end of the streams (seconds), or
+            None to wait forever (see :meth:`.DAQ.stop`).
+        :returns: True if all the experiments stopped cleanly.
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with ThreadPoolExecutor(max_workers=len(self.ports) or 1) as ex:
+            clean = all(list(ex.map(lambda daq: daq.stop(timeout=timeout),
+                                    self)))
+
+        if self.__thread:
+            # the devices given up leave the loop in POLL_INTERVAL
+            left = None
+            if deadline is not None:
+                left = max(deadline - time.time(), 0) + POLL_INTERVAL
+            self.__thread.join(left)
+            clean = clean and not self.__thread.is_alive()
+        return clean
+
+    def close(self):
+        """Close the serial ports of all the devices."""
+        for daq in self:
+            daq.close()
+
+    def __run(self):
+        """I/O loop, serving the devices until all experiments finish.
+
+        A device that fails to be read is given up (see
+        :meth:`.DAQ.abort_stream`), and the others are still served.
+        """
+        sel = selectors.DefaultSelector()
+        polled = []
+        fds = {}
+        for daq in self:
+            if not daq.is_measuring:
+                continue
+            try:
+                fds[daq] = daq.ser.fileno()
+                sel.register(fds[daq], selectors.EVENT_READ, daq)
+            except (AttributeError, ValueError):
+                fds.pop(daq, None)
+                polled.append(daq)   # e.g. the simulator
+
+        # devices without data are also fed, every POLL_INTERVAL, so they
+        # leave the loop when stop() gives up on them
+        serving = [daq for daq in self if daq.is_measuring]
+        while serving:
+            ready = set(key.data for key, _ in sel.select(POLL_INTERVAL))
+            for daq in list(serving):
+                try:
+                    data = b''
+                    if daq in polled:
+                        data = daq.ser.read(daq.ser.in_waiting)
+                    elif daq in ready:
+                        data = daq.ser.read(max(1, daq.ser.in_waiting))
+                    if daq.feed_stream(data):
+                        continue
+                except IOError as e:
+                    daq.abort_stream(e)
+
+                serving.remove(daq)
+                if daq in fds:
+                    sel.unregister(fds.pop(daq))
+        sel.close()
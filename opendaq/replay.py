@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+
+# Copyright 2016
+# Ingen10 Ingenieria SL
+#
+# This file is part of opendaq.
+#
+# opendaq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# opendaq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with opendaq.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import struct
+
+MAGIC = b'ODAQREC1'
+RECORD_HEAD = struct.Struct('!BdH')     # kind, timestamp, length
+MAX_CHUNK = 65535
+WRITE = 0
+READ = 1
+POLL_TIME = 0.001   # wait of a read when no recorded data is available (s)
+
+
+def read_records(path):
+    """Read a recorded session.
+
+    :param path: Path of the recording.
+    :returns: List of (kind, timestamp, data) tuples, kind being WRITE or
+        READ.
+    :raises: ValueError: The file is not a recording.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not a recording of serial traffic")
+
+    records = []
+    pos = len(MAGIC)
+    while pos + RECORD_HEAD.size <= len(data):
+        kind, t, n = RECORD_HEAD.unpack_from(data, pos)
+        pos += RECORD_HEAD.size
+        records.append((kind, t, bytes(data[pos:pos + n])))
+        pos += n
+    return records
+
+
+class RecordingSerial(object):
+    """Serial port wrapper recording all the traffic.
+
+    Every write and every non-empty read is appended to a binary file, with
+    its timestamp. Other attributes are taken from the wrapped port.
+
+    :param ser: Serial port (or serial-like object).
+    :param path: Path of the recording. New sessions are appended to it.
+    """
+    def __init__(self, ser, path):
+        self.ser = ser
+        self.file = open(path, 'ab')
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+
+    def __getattr__(self, name):
+        return getattr(self.ser, name)
+
+    def __record(self, kind, data):
+        t = time.time()
+        data = bytes(data)
+        for i in range(0, len(data), MAX_CHUNK):
+            chunk = data[i:i + MAX_CHUNK]
+            self.file.write(RECORD_HEAD.pack(kind, t, len(chunk)) + chunk)
+        self.file.flush()   # keep the recording if the process dies
+
+    def write(self, data):
+        self.__record(WRITE, data)
+        return self.ser.write(data)
+
+    def read(self, size=1):
+        data = self.ser.read(size)
+        if data:
+            self.__record(READ, data)
+        return data
+
+    @property
+    def in_waiting(self):
+        return self.ser.in_waiting
+
+    def close(self):
+        self.ser.close()
+        self.file.close()
+
+
+class ReplaySerial(object):
+    """Serial-like object serving the bytes of a recorded session.
+
+    A :class:`.DAQ` can use it as its port. Recorded reads are available
+    once all the bytes written before them have been written again, so
+    responses never arrive before their commands.
+
+    :param path: Path of the recording.
+    :param strict: Raise an IOError if the written bytes differ from the
+        recorded ones.
+    :param timeout: Like the serial timeout, the longest time that a read
+        waits for data (seconds).
+    """
+    def __init__(self, path, strict=True, timeout=1):
+        self.port = path
+        self.strict = strict
+        self.timeout = timeout
+        self.baudrate = None
+        self.records = read_records(path)
+
+        self.__written = bytearray()    # recorded writes
+        self.__reads = []   # (bytes written before, data) of every read
+        for kind, _, data in self.records:
+            if kind == WRITE:
+                self.__written += data
+            else:
+                self.__reads.append((len(self.__written), data))
+
+        self.is_open = True
+        self.__nwritten = 0
+        self.__next = 0     # next read record
+        self.__buf = bytearray()
+
+    def open(self):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    @property
+    def exhausted(self):
+        """True when all the recorded reads have been served."""
+        return self.__next == len(self.__reads) and not self.__buf
+
+    def __release(self):
+        """Make available the reads allowed by the bytes written so far."""
+        while self.__next < len(self.__reads) and \
+                self.__reads[self.__next][0] <= self.__nwritten:
+            self.__buf += self.__reads[self.__next][1]
+            self.__next += 1
+
+    def write(self, data):
+        if not self.is_open:
+            raise IOError("Port is closed")
+
+        data = bytearray(data)
+        end = self.__nwritten + len(data)
+        if self.strict and self.__written[self.__nwritten:end] != data:
+            raise IOError("Written bytes differ from the recording at "
+                          "offset %d" % self.__nwritten)
+        self.__nwritten = end
+        return len(data)
+
+    def read(self, size=1):
+        if not self.is_open:
+            raise IOError("Port is closed")
+
+        self.__release()
+        deadline = time.time() + (self.timeout or 0)
+        while len(self.__buf) < size and time.time() < deadline and \
+                self.__next < len(self.__reads):
+            time.sleep(POLL_TIME)
+            self.__release()
+
+        ret = bytes(self.__buf[:size])
+        del self.__buf[:len(ret)]
+        return ret
+
+    @property
+    def in_waiting(self):
+        self.__release()
+        return len(self.__buf)
+
+    def flushInput(self):
+        self.__release()
+        self.__buf = bytearray()
+
+    def reset_input_buffer(self):
+        self.flushInput()
+
+    def setRTS(self, value):
+        pass
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+# Copyright 2016
+# Ingen10 Ingenieria SL
+#
+# This file is part of opendaq.
+#
+# opendaq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# opendaq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with opendaq.  If not, see <http://www.gnu.org/licenses/>.
+
+from .common import CMD
+
+# Commands that can be sent twice with the same effect as once: they read
+# the device state or set it to absolute values.
+IDEMPOTENT = frozenset([
+    CMD.AIN, CMD.AIN_CFG, CMD.PIO, CMD.AIN_ALL, CMD.PIO_DIR, CMD.PORT,
+    CMD.PORT_DIR, CMD.PWM_DUTY, CMD.SET_DAC, CMD.GET_CAPTURE, CMD.LED_W,
+    CMD.CHANNEL_CFG, CMD.SET_ANALOG, CMD.EEPROM_WRITE, CMD.EEPROM_READ,
+    CMD.CHANNEL_SETUP, CMD.TRIGGER_SETUP, CMD.GET_TRIGGER_MODE,
+    CMD.GET_STATE_CHANNEL, CMD.GET_CALIB, CMD.SET_CALIB, CMD.ID_CONFIG,
+    CMD.GET_ENCODER, CMD.ENABLE_CRC
+])
+
+
+class RetryPolicy(object):
+    """When and how a :class:`.DAQ` resends a failed command.
+
+    A command is retried when its response is corrupted (CRCError), short
+    (LengthError) or a NAK (NAKError), if it is idempotent. Before every
+    retry, the policy waits (doubling the wait after each attempt) and the
+    input buffer is flushed, to drop the rest of a garbled response.
+
+    :param attempts: Maximum number of times that a command is sent.
+    :param deadline: Maximum time spent retrying a command (seconds). No
+        retry starts after it.
+    :param backoff: Wait before the first retry (seconds).
+    :param commands: Command numbers that may be retried (default:
+        IDEMPOTENT).
+    """
+    def __init__(self, attempts=3, deadline=2., backoff=0.01,
+                 commands=IDEMPOTENT):
+        if attempts < 1:
+            raise ValueError("Invalid number of attempts")
+        self.attempts = attempts
+        self.deadline = deadline
+        self.backoff = backoff
+        self.commands = frozenset(commands)
+
+    def retries(self, ncmd):
+        """Whether a command may be retried."""
+        return ncmd in self.commands
+
+    def delay(self, attempt):
+        """Wait before resending a command that failed some attempt."""
+        return self.backoff*2**(attempt - 1)
@@ -35,14 +35,21 @@ class SerialSim(object):
     def _init(self):
         self.rts = 1
         self.port_open = True
-        self.NACK = '\x00\xa0\xa0\x00'
+        self.NACK = bytearray(b'\x00\xa0\xa0\x00')
         self.__out_buf = bytearray()
 
     @classmethod
     def command(cls, ncmd, cmd_fmt, ret_fmt):
-        """Command decorator"""
+        """Command decorator
+
+        A '%d' in cmd_fmt stands for the number of trailing items of a
+        variable-length command. If ret_fmt is None, the command returns
+        the response format together with the response values, or the raw
+        bytes to send back (e.g. nothing, for commands without a response).
+        """
         def inner_command(f):
-            cmd_len = struct.calcsize(cmd_fmt)
+            cmd_len = (None if '%d' in cmd_fmt else
+                       struct.calcsize('!' + cmd_fmt))
             cls.__commands[f.__name__] = (f, ncmd, cmd_len, cmd_fmt, ret_fmt)
 
             def wrapped(*args, **kwargs):
@@ -53,8 +60,9 @@ class SerialSim(object):
 
     def __get_command(self, ncmd, length):
         try:
-            ret = next((e for e in self.__commands.values()
-                        if e[1] == ncmd and e[2] == length))
+            ret = next((e for e in sorted(self.__commands.values(),
+                                          key=lambda e: e[2] is None)
+                        if e[1] == ncmd and e[2] in (length, None)))
         except StopIteration:
             raise ValueError("Invalid command number")
         return ret
@@ -80,10 +88,19 @@ class SerialSim(object):
     def exec_command(self, data):
         try:
             ncmd, ln, cmd_data = self.__unpack_header(data)
-            f, _, _, cmd_fmt, ret_fmt = self.__get_command(ncmd, ln)
+            f, _, cmd_len, cmd_fmt, ret_fmt = self.__get_command(ncmd, ln)
+            if cmd_len is None:
+                fixed = struct.calcsize('!' + cmd_fmt % 0)
+                item = struct.calcsize('!' + cmd_fmt[-1])
+                cmd_fmt = cmd_fmt % ((ln - fixed) // item)
             args = struct.unpack('!'+cmd_fmt, cmd_data)
-            ret = self.__pack_response(ncmd, f(self, *args), ret_fmt)
-        except (LengthError, ValueError):
+            ret = f(self, *args)
+            if isinstance(ret, bytearray):
+                return ret
+            if ret_fmt is None:
+                ret_fmt, ret = ret
+            ret = self.__pack_response(ncmd, ret, ret_fmt)
+        except (LengthError, ValueError, struct.error):
             return self.NACK
         return ret
 
@@ -91,24 +108,38 @@ class SerialSim(object):
         if not self.port_open:
             raise IOError("Port is closed")
 
-        self.__out_buf.extend(self.exec_command(data))
+        # several commands may be written at once
+        data = bytearray(data)
+        pos = 0
+        while pos < len(data):
+            end = pos + 4 + (data[pos + 3] if pos + 3 < len(data) else 0)
+            self.__out_buf.extend(self.exec_command(data[pos:end]))
+            pos = end
         return len(data)
 
     def read(self, size=1):
         if not self.port_open:
             raise IOError("Port is closed")
 
-        ret = bytearray()
-        for i in range(size):
-            try:
-                ret.append(self.__out_buf.pop(0))
-            except IndexError:
-                break
-        return bytes(ret)
+        ret = bytes(self.__out_buf[:size])
+        del self.__out_buf[:len(ret)]
+        return ret
+
+    def _send(self, data):
+        """Queue bytes sent by the device on its own (not as a response)."""
+        self.__out_buf.extend(data)
+
+    @property
+    def in_waiting(self):
+        return len(self.__out_buf)
 
     def flushInput(self):
         self.__out_buf = bytearray()
 
+    @property
+    def is_open(self):
+        return self.port_open
+
     def open(self):
         self.port_open = True
 
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+# Copyright 2016
+# Ingen10 Ingenieria SL
+#
+# This file is part of opendaq.
+#
+# opendaq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# opendaq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with opendaq.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory = None
+
+HEADER_SIZE = 24    # write counter, stop flag and reserve counter (int64)
+
+
+class SharedRing(object):
+    """Single-producer, single-consumer ring buffer of raw samples living in
+    shared memory.
+
+    The producer (stream reader process) advances a reserve counter before
+    copying the samples, and the write counter after copying them, so no
+    lock is needed: the consumer checks the reserve counter after its own
+    copy to find the samples overwritten meanwhile. When the consumer falls
+    behind by more than the ring capacity, the oldest samples are lost and
+    reported by :meth:`read`.
+
+    :param capacity: Number of signed 16-bit samples.
+    :param name: Name of an existing ring to attach to (None: create one).
+    :raises: ImportError (shared memory not available)
+    """
+    def __init__(self, capacity=65536, name=None):
+        if shared_memory is None:
+            raise ImportError("Shared memory needs Python 3.8 or newer")
+
+        size = HEADER_SIZE + 2*capacity
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.capacity = capacity
+        self.header = np.ndarray(3, dtype=np.int64, buffer=self.shm.buf)
+        self.data = np.ndarray(capacity, dtype=np.int16, buffer=self.shm.buf,
+                               offset=HEADER_SIZE)
+        if name is None:
+            self.header[:] = 0
+        self.nread = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @property
+    def stopped(self):
+        """True when the producer signaled the end of the experiment."""
+        return bool(self.header[1])
+
+    def stop(self):
+        self.header[1] = 1
+
+    def write(self, values):
+        """Append samples to the ring (producer side)."""
+        values = np.asarray(values, dtype=np.int16)
+        w = int(self.header[0]) + max(len(values) - self.capacity, 0)
+        values = values[-self.capacity:]
+        n = len(values)
+        self.header[2] = w + n  # samples up to here may be overwritten
+        i = w % self.capacity
+        k = min(n, self.capacity - i)
+        self.data[i:i + k] = values[:k]
+        self.data[:n - k] = values[k:]
+        self.header[0] = w + n
+
+    def read(self):
+        """Return the available samples (consumer side).
+
+        :returns:
+            - lost: Number of samples overwritten before being read.
+            - data: Array of samples.
+        """
+        w = int(self.header[0])
+        lost = max(w - self.nread - self.capacity, 0)
+        r = self.nread + lost
+
+        i = r % self.capacity
+        n = w - r
+        k = min(n, self.capacity - i)
+        data = np.concatenate((self.data[i:i + k], self.data[:n - k]))
+
+        # samples overwritten by the producer while copying, including a
+        # write still in progress
+        overrun = min(max(int(self.header[2]) - r - self.capacity, 0), n)
+        self.nread = w
+        return lost + overrun, data[overrun:]
+
+    def close(self, unlink=False):
+        """Release the shared memory block."""
+        del self.header, self.data
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
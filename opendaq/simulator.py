@@ -18,19 +18,190 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with opendaq.  If not, see <http://www.gnu.org/licenses/>.
 
-from random import randint
+from __future__ import division
+import time
+from threading import RLock
+import numpy as np
+from .common import CMD
 from .serial_sim import SerialSim
+from .stream import stream_packet
+from .daq_model import DAQModel
+from . import models  # noqa: F401 (registers the models in DAQModel)
 
 NPIOS = 7
 NCALIB = 16
 NINPUTS = 8
 NGAINS = 4
 NDACS = 4
+EEPROM_SIZE = 254
+COUNTER_PIO = 6     # input of the edge counter
+NCHANNELS = 4
+PACKET_SAMPLES = 20     # max samples per stream packet
+VIRTUAL_STEP = 10000    # virtual time made when the output is drained (us)
+POLL_TIME = 0.005       # longest wait of a read in real-time mode (s)
+ADC_TIME = 20e-6        # time between the samples averaged by the ADC (s)
+
+# experiment modes and trigger modes (see ExpMode and Trigger)
+ANALOG_IN, ANALOG_OUT, DIGITAL_IN, DIGITAL_OUT, COUNTER_IN, CAPTURE_IN = \
+    range(6)
+TRIGGER_ABIG = 10
+TRIGGER_ASML = 20
+
+
+def _int16(values):
+    """Wrap integer values to the range of the stream data."""
+    return (np.asarray(values, dtype=np.int64) + 2**15) % 2**16 - 2**15
+
+
+class Signal(object):
+    """Signal source of a simulated analog input.
+
+    Sources are evaluated in blocks: they get an array of times and return
+    the voltages at those times.
+    """
+    def __call__(self, sim, t):
+        """Voltages of the signal.
+
+        :param sim: The :class:`DAQSimulator`.
+        :param t: Array of times (seconds).
+        """
+        raise NotImplementedError
+
+
+class DC(Signal):
+    """Constant voltage."""
+    def __init__(self, volts=0.):
+        self.volts = volts
+
+    def __call__(self, sim, t):
+        return np.full(np.shape(t), float(self.volts))
+
+
+class Sine(Signal):
+    """Sine wave."""
+    def __init__(self, amplitude, frequency, offset=0., phase=0.):
+        self.amplitude = amplitude
+        self.frequency = frequency
+        self.offset = offset
+        self.phase = phase
+
+    def __call__(self, sim, t):
+        return self.offset + self.amplitude*np.sin(
+            2*np.pi*self.frequency*np.asarray(t) + self.phase)
+
+
+class Square(Signal):
+    """Square wave, between offset - amplitude and offset + amplitude."""
+    def __init__(self, amplitude, frequency, offset=0., duty=0.5):
+        self.amplitude = amplitude
+        self.frequency = frequency
+        self.offset = offset
+        self.duty = duty
+
+    def __call__(self, sim, t):
+        high = (np.asarray(t)*self.frequency) % 1 < self.duty
+        return self.offset + np.where(high, self.amplitude, -self.amplitude)
+
+
+class Ramp(Signal):
+    """Sawtooth wave, rising from offset - amplitude to offset + amplitude."""
+    def __init__(self, amplitude, frequency, offset=0.):
+        self.amplitude = amplitude
+        self.frequency = frequency
+        self.offset = offset
+
+    def __call__(self, sim, t):
+        phase = (np.asarray(t)*self.frequency) % 1
+        return self.offset + self.amplitude*(2*phase - 1)
+
+
+class Noise(Signal):
+    """Gaussian noise, from a seeded generator (the sequence is the same
+    on every run)."""
+    def __init__(self, sigma, offset=0., seed=0):
+        self.sigma = sigma
+        self.offset = offset
+        self.rng = np.random.RandomState(seed)
+
+    def __call__(self, sim, t):
+        return self.offset + self.sigma*self.rng.standard_normal(np.shape(t))
+
+
+class DACLoopback(Signal):
+    """Input wired to the DAC output."""
+    def __init__(self, number=1):
+        self.number = number
+
+    def __call__(self, sim, t):
+        volts = sim.model.dac_to_volts(sim.dac_values[self.number],
+                                       self.number - 1)
+        return np.full(np.shape(t), float(volts))
+
+
+class Channel(object):
+    """A DataChannel of the simulated device.
+
+    :param number: DataChannel number.
+    :param period: Sampling period (microseconds), or None for External
+        experiments (they are clocked by edges that are not simulated).
+    """
+    def __init__(self, number, period):
+        self.number = number
+        self.period = period
+        self.mode = ANALOG_IN
+        self.pinput = 1
+        self.ninput = 0
+        self.gain = 0
+        self.nsamples = 1
+        self.npoints = 0
+        self.run_once = False
+        self.trigger = (0, 0)
+        self.reset()
+
+    def reset(self):
+        self.origin = None  # trigger time (us), None until triggered
+        self.count = 0      # samples taken
+        self.done = False
+
+    @property
+    def limit(self):
+        """Number of samples of the experiment (None: endless)."""
+        return self.npoints if self.npoints and self.run_once else None
+
+    def next_time(self):
+        """Time of the next sample (us)."""
+        if self.done or self.period is None or self.origin is None:
+            return float('inf')
+        return self.origin + (self.count + 1)*self.period
 
 
 class DAQSimulator(SerialSim):
-    def __init__(self, port=None, baudrate=9600, timeout=None):
+    """Simulated openDAQ.
+
+    Besides the commands, the stream experiments are simulated. Samples are
+    generated in real time, or, if :attr:`virtual_clock` is set, as fast as
+    the host reads them: the simulated time only advances when all the
+    generated data has been read. In both cases, packets are ordered by the
+    time of their first sample, and then by DataChannel number, so runs are
+    deterministic.
+
+    A :class:`.DAQ` uses the virtual clock with ``DAQ('sim',
+    virtual_clock=True)``.
+    """
+    def __init__(self, port=None, baudrate=9600, timeout=None,
+                 virtual_clock=False):
         SerialSim.__init__(self, port, baudrate, timeout)
+        self.virtual_clock = virtual_clock
+        self.channels = {}
+        self.signal = []
+        self.streaming = False
+        self.clock = 0      # simulated time since the stream start (us)
+        self.sources = dict((i, Noise(0.5, seed=i))
+                            for i in range(1, NINPUTS + 1))
+        self.__model = None
+        self.__t0 = 0.
+        self.__created = time.time()
+        self.__lock = RLock()
         self.pios = [0]*NPIOS
         self.pios_dir = [0]*NPIOS
         self.led_color = 0
@@ -41,24 +212,319 @@ class DAQSimulator(SerialSim):
         self.adc_nsamples = 20
         self.calib_gains = [100]*17
         self.calib_offsets = [1]*17
+        self.eeprom = bytearray(EEPROM_SIZE)
+        self.counter = 0
+        self.encoder = 0
+        self.capture_period = 1000
 
         self.hw_ver = 2
         self.fw_ver = 131
         self.dev_id = 456423
 
-    @SerialSim.command(18, 'BB', 'BB')
+    def set_source(self, pinput, source):
+        """Connect a signal source to an analog input.
+
+        :param pinput: Analog input [1:8].
+        :param source: A :class:`Signal` (e.g. ``Sine(1., 50.)``).
+        """
+        if not 0 < pinput <= NINPUTS:
+            raise ValueError("Invalid input")
+        self.sources[pinput] = source
+
+    @property
+    def model(self):
+        """Model of the simulated device, with its calibration."""
+        if self.__model is None:
+            model = DAQModel.new(self.hw_ver, self.fw_ver, self.dev_id)
+
+            def read_slot(i):
+                return self.calib_gains[i], self.calib_offsets[i]
+
+            model._set_dac_calib(read_slot)
+            model._set_adc_calib(read_slot)
+            self.__model = model
+        return self.__model
+
+    def time(self):
+        """Current simulated time (seconds)."""
+        if self.virtual_clock:
+            return self.clock/1e6
+        if self.streaming:
+            return time.time() - self.__t0
+        return time.time() - self.__created
+
+    def analog_read(self, t, pinput, ninput=0, gain=0, nsamples=1):
+        """Raw ADC readings of an analog input configuration.
+
+        Every reading is the average of nsamples conversions, taken
+        ADC_TIME apart.
+
+        :param t: Array of times (seconds).
+        :param pinput: Positive input.
+        :param ninput: Negative input (0: ground).
+        :param gain: PGA gain ID.
+        :param nsamples: Number of conversions averaged per reading.
+        :returns: Array of raw values.
+        """
+        ts = (np.asarray(t, dtype=float)[:, None] +
+              ADC_TIME*np.arange(max(nsamples, 1)))
+        volts = self.sources[pinput](self, ts)
+        if 0 < ninput <= NINPUTS:
+            volts = volts - self.sources[ninput](self, ts)
+        return self.model.volts_to_adc(volts.mean(axis=1), gain, pinput,
+                                       ninput)
+
+    def __analog_now(self):
+        return int(self.analog_read([self.time()], self.adc_pinput,
+                                    self.adc_ninput, self.adc_gain,
+                                    self.adc_nsamples)[0])
+
+    def write(self, data):
+        with self.__lock:
+            return SerialSim.write(self, data)
+
+    def read(self, size=1):
+        with self.__lock:
+            self.__update()
+            delay = None
+            if self.streaming and not self.virtual_clock and \
+                    not SerialSim.in_waiting.fget(self):
+                delay = (self.__next_event() - self.__now())/1e6
+
+        if delay is not None:
+            # wait for the next sample, like a real port would do
+            time.sleep(min(max(delay, 0), POLL_TIME))
+
+        with self.__lock:
+            self.__update()
+            return SerialSim.read(self, size)
+
+    @property
+    def in_waiting(self):
+        with self.__lock:
+            self.__update()
+            return SerialSim.in_waiting.fget(self)
+
+    def __now(self):
+        return int((time.time() - self.__t0)*1e6)
+
+    def __next_event(self):
+        return min([ch.next_time() for ch in self.channels.values()] +
+                   [float('inf')])
+
+    def __update(self):
+        """Generate the stream data up to the current time."""
+        if not self.streaming:
+            return
+        if not self.virtual_clock:
+            self._send(self.__generate(self.__now()))
+        elif not SerialSim.in_waiting.fget(self):
+            until = max(self.clock + VIRTUAL_STEP, self.__next_event())
+            if until == float('inf'):
+                until = self.clock + VIRTUAL_STEP
+            self._send(self.__generate(until))
+
+    def __triggered(self, ch):
+        mode, value = ch.trigger
+        if 1 <= mode <= 6:
+            return self.pios[mode - 1] == value
+        if mode in (TRIGGER_ABIG, TRIGGER_ASML):
+            level = self.__values(ch, np.array([self.clock]))[0]
+            return level > value if mode == TRIGGER_ABIG else level < value
+        return True
+
+    def __values(self, ch, t):
+        """Samples of a DataChannel at the given times (us).
+
+        :returns: Array of raw values, or None for output experiments.
+        """
+        if ch.mode == ANALOG_IN:
+            return self.analog_read(t/1e6, ch.pinput, ch.ninput, ch.gain,
+                                    ch.nsamples)
+        if ch.mode == DIGITAL_IN:
+            return np.full(len(t), self.cmd_read_port(), dtype=int)
+        if ch.mode == COUNTER_IN:
+            return _int16(np.full(len(t), self.counter))
+        if ch.mode == CAPTURE_IN:
+            return _int16(np.full(len(t), self.capture_period))
+        if ch.mode == ANALOG_OUT and self.signal:
+            self.dac_values[1] = self.signal[(ch.count + len(t) - 1) %
+                                             len(self.signal)]
+        return None
+
+    def __generate(self, until):
+        """Stream packets of the samples taken up to a given time.
+
+        :param until: Simulated time (us).
+        :returns: Packet bytes.
+        """
+        packets = []
+        for n, ch in sorted(self.channels.items()):
+            if ch.done:
+                continue
+            if ch.origin is None:
+                if not self.__triggered(ch):
+                    continue
+                ch.origin = self.clock
+            if ch.period is None:
+                continue
+
+            total = int(max(until - ch.origin, 0)//ch.period)
+            if ch.limit is not None:
+                total = min(total, ch.limit)
+            if total > ch.count:
+                t = ch.origin + ch.period*np.arange(ch.count + 1, total + 1)
+                values = self.__values(ch, t)
+                for i in range(0, len(t) if values is not None else 0,
+                               PACKET_SAMPLES):
+                    chunk = _int16(values[i:i + PACKET_SAMPLES]).tolist()
+                    packets.append((t[i], n, stream_packet(n, chunk)))
+                ch.count = total
+
+            if ch.limit is not None and ch.count >= ch.limit:
+                ch.done = True
+                packets.append((ch.origin + ch.count*ch.period, n,
+                                stream_packet(n)))
+
+        self.clock = max(self.clock, until)
+        if all(ch.done for ch in self.channels.values()):
+            self.streaming = False
+
+        data = bytearray()
+        for _, _, packet in sorted(packets, key=lambda p: p[:2]):
+            data += packet
+        return data
+
+    def __check_channel(self, number):
+        if not 1 <= number <= NCHANNELS:
+            raise ValueError("Invalid DataChannel number")
+
+    def __channel(self, number):
+        self.__check_channel(number)
+        try:
+            return self.channels[number]
+        except KeyError:
+            raise ValueError("DataChannel not created")
+
+    @SerialSim.command(CMD.STREAM_CREATE, 'BH', 'BH')
+    def cmd_stream_create(self, number, period):
+        self.__check_channel(number)
+        if not period > 0:
+            raise ValueError("Invalid period")
+        self.channels[number] = Channel(number, 1000*period)
+        return number, period
+
+    @SerialSim.command(CMD.EXTERNAL_CREATE, 'BB', 'BB')
+    def cmd_external_create(self, number, edge):
+        self.__check_channel(number)
+        self.channels[number] = Channel(number, None)
+        return number, edge
+
+    @SerialSim.command(CMD.BURST_CREATE, 'H', 'H')
+    def cmd_burst_create(self, period):
+        if not period > 0:
+            raise ValueError("Invalid period")
+        self.channels = {1: Channel(1, period)}
+        return period
+
+    @SerialSim.command(CMD.CHANNEL_CFG, 'BBBBBB', 'BBBBBB')
+    def cmd_channel_cfg(self, number, mode, pinput, ninput, gain, nsamples):
+        ch = self.__channel(number)
+        if not 0 <= mode <= CAPTURE_IN:
+            raise ValueError("Invalid mode")
+        ch.mode = mode
+        ch.pinput, ch.ninput = pinput, ninput
+        ch.gain, ch.nsamples = gain, nsamples
+        return number, mode, pinput, ninput, gain, nsamples
+
+    @SerialSim.command(CMD.CHANNEL_SETUP, 'BHb', 'BHB')
+    def cmd_channel_setup(self, number, npoints, run_once):
+        ch = self.__channel(number)
+        ch.npoints = npoints
+        ch.run_once = bool(run_once)
+        return number, npoints, run_once
+
+    @SerialSim.command(CMD.TRIGGER_SETUP, 'BBH', 'BBH')
+    def cmd_trigger_setup(self, number, mode, value):
+        self.__channel(number).trigger = (mode, value)
+        return number, mode, value
+
+    @SerialSim.command(CMD.GET_TRIGGER_MODE, 'B', 'H')
+    def cmd_get_trigger_mode(self, number):
+        return self.__channel(number).trigger[0]
+
+    @SerialSim.command(CMD.GET_STATE_CHANNEL, 'B', 'H')
+    def cmd_get_state_channel(self, number):
+        ch = self.__channel(number)
+        return int(self.streaming and not ch.done)
+
+    @SerialSim.command(CMD.CHANNEL_FLUSH, 'B', 'B')
+    def cmd_channel_flush(self, number):
+        self.__check_channel(number)
+        return number
+
+    @SerialSim.command(CMD.CHANNEL_DESTROY, 'B', 'B')
+    def cmd_channel_destroy(self, number):
+        self.__check_channel(number)
+        self.channels.pop(number, None)
+        return number
+
+    @SerialSim.command(CMD.SIGNAL_LOAD, 'h%dh', 'Bh')
+    def cmd_signal_load(self, offset, *values):
+        if offset < 0:
+            raise ValueError("Invalid offset")
+        if len(self.signal) < offset:
+            self.signal += [0]*(offset - len(self.signal))
+        self.signal[offset:offset + len(values)] = values
+        return len(values), offset
+
+    @SerialSim.command(CMD.STREAM_START, '', '')
+    def cmd_stream_start(self):
+        for ch in self.channels.values():
+            ch.reset()
+        self.clock = 0
+        self.__t0 = time.time()
+        self.streaming = bool(self.channels)
+        return ()
+
+    @SerialSim.command(CMD.STREAM_STOP, '', None)
+    def cmd_stream_stop(self):
+        if not self.streaming:
+            return bytearray()
+
+        data = bytearray()
+        if not self.virtual_clock:
+            data = self.__generate(self.__now())
+        for n, ch in sorted(self.channels.items()):
+            if not ch.done:
+                ch.done = True
+                data += stream_packet(n)
+        self.streaming = False
+        return data
+
+    @SerialSim.command(CMD.GET_CAPTURE, 'B', 'BI')
+    def cmd_get_capture(self, mode):
+        if mode not in (0, 1, 2):
+            raise ValueError("Invalid capture mode")
+        return mode, self.capture_period // (1 if mode == 2 else 2)
+
+    @SerialSim.command(CMD.WAIT_MS, 'B', 'B')
+    def cmd_wait_ms(self, ms):
+        return ms
+
+    @SerialSim.command(CMD.LED_W, 'BB', 'BB')
     def cmd_led_w(self, color, nled):
         self.led_color = int(color)
         return color, nled
 
-    @SerialSim.command(3, 'B', 'BB')
+    @SerialSim.command(CMD.PIO, 'B', 'BB')
     def cmd_read_pio(self, npio):
         if not 0 < npio <= NPIOS:
             raise ValueError("Invalid PIO number")
 
         return npio, self.pios[npio-1]
 
-    @SerialSim.command(3, 'BB', 'BB')
+    @SerialSim.command(CMD.PIO, 'BB', 'BB')
     def cmd_set_pio(self, npio, value):
         if not 0 < npio <= NPIOS:
             raise ValueError("Invalid PIO number")
@@ -68,14 +534,14 @@ class DAQSimulator(SerialSim):
         self.pios[npio-1] = value
         return npio, value
 
-    @SerialSim.command(5, 'B', 'BB')
+    @SerialSim.command(CMD.PIO_DIR, 'B', 'BB')
     def cmd_get_pio_dir(self, npio):
         if not 0 < npio <= NPIOS:
             raise ValueError("Invalid PIO number")
 
         return npio, self.pios_dir[npio-1]
 
-    @SerialSim.command(5, 'BB', 'BB')
+    @SerialSim.command(CMD.PIO_DIR, 'BB', 'BB')
     def cmd_set_pio_dir(self, npio, dir):
         if not 0 < npio <= NPIOS:
             raise ValueError("Invalid PIO number")
@@ -85,25 +551,45 @@ class DAQSimulator(SerialSim):
         self.pios_dir[npio-1] = dir
         return npio, dir
 
-    @SerialSim.command(13, 'hB', 'hB')
+    @SerialSim.command(CMD.PORT, '', 'B')
+    def cmd_read_port(self):
+        return sum(v << i for i, v in enumerate(self.pios))
+
+    @SerialSim.command(CMD.PORT, 'B', 'B')
+    def cmd_set_port(self, value):
+        self.pios = [(value >> i) & 1 for i in range(NPIOS)]
+        return value
+
+    @SerialSim.command(CMD.PORT_DIR, 'B', 'B')
+    def cmd_set_port_dir(self, value):
+        self.pios_dir = [(value >> i) & 1 for i in range(NPIOS)]
+        return value
+
+    @SerialSim.command(CMD.SET_DAC, 'hB', 'hB')
     def cmd_set_dac(self, value, n):
         if not 0 <= n < NDACS:
             raise ValueError("Invalid DAC number")
-        if not -4096 <= value < 4096:
-            raise ValueError("Invalid voltage value")
 
         self.dac_values[n] = value
         return value, n
 
-    @SerialSim.command(1, '', 'h')
+    @SerialSim.command(CMD.AIN, '', 'h')
     def cmd_read_analog(self):
-        return randint(-2**14, 2**14 - 1)
+        return self.__analog_now()
 
-    @SerialSim.command(2, 'BBBB', 'hBBBB')
+    @SerialSim.command(CMD.AIN_ALL, 'BB', '8h')
+    def cmd_read_all(self, nsamples, gain):
+        if not 0 <= gain < NGAINS:
+            raise ValueError("Invalid gain")
+        t = [self.time()]
+        return tuple(int(self.analog_read(t, i, 0, gain, nsamples)[0])
+                     for i in range(1, NINPUTS + 1))
+
+    @SerialSim.command(CMD.AIN_CFG, 'BBBB', 'hBBBB')
     def cmd_ain_cfg(self, pinput, ninput, gain, nsamples):
         if not 0 < pinput <= NINPUTS:
             raise ValueError("Invalid positive input")
-        if ninput not in (0, 5, 6, 7, 8, 25):
+        if not 0 <= ninput <= NINPUTS and ninput != 25:
             raise ValueError("Invalid negative input")
         if not 0 <= gain < NGAINS:
             raise ValueError("Invalid gain")
@@ -114,14 +600,62 @@ class DAQSimulator(SerialSim):
         self.adc_ninput = ninput
         self.adc_gain = gain
         self.adc_nsamples = nsamples
-        value = randint(-2**14, 2**14 - 1)
-        return value, pinput, ninput, gain, nsamples
+        return self.__analog_now(), pinput, ninput, gain, nsamples
+
+    @SerialSim.command(CMD.SPISW_SETUP, 'BBB', 'BBB')
+    def cmd_spisw_setup(self, sck, mosi, miso):
+        if not all(0 < n < NPIOS for n in (sck, mosi, miso)):
+            raise ValueError("Invalid PIO number")
+
+        self.pios_dir[sck - 1] = self.pios_dir[mosi - 1] = 1
+        self.pios_dir[miso - 1] = 0
+        return sck, mosi, miso
+
+    @SerialSim.command(CMD.SPISW_TRANSFER, 'B', 'B')
+    def cmd_spi_transfer(self, value):
+        # MOSI looped back to MISO
+        return value
+
+    @SerialSim.command(CMD.SPISW_TRANSFER, 'H', 'H')
+    def cmd_spi_transfer_word(self, value):
+        return value
+
+    @SerialSim.command(CMD.EEPROM_WRITE, 'BB%dB', None)
+    def cmd_eeprom_write(self, pos, length, *data):
+        if length != len(data) or pos + length > EEPROM_SIZE:
+            raise ValueError("Invalid EEPROM position")
+        self.eeprom[pos:pos + length] = bytearray(data)
+        return 'BB%dB' % length, (pos, length) + data
+
+    @SerialSim.command(CMD.EEPROM_READ, 'BB', None)
+    def cmd_eeprom_read(self, pos, length):
+        if pos + length > EEPROM_SIZE:
+            raise ValueError("Invalid EEPROM position")
+        data = tuple(self.eeprom[pos:pos + length])
+        return 'BB%dB' % length, (pos, length) + data
+
+    @SerialSim.command(CMD.COUNTER_INIT, 'B', 'B')
+    def cmd_counter_init(self, edge):
+        self.pios_dir[COUNTER_PIO - 1] = 0
+        self.counter = 0
+        return edge
+
+    @SerialSim.command(CMD.GET_COUNTER, 'B', 'I')
+    def cmd_get_counter(self, reset):
+        value = self.counter
+        if reset:
+            self.counter = 0
+        return value
+
+    @SerialSim.command(CMD.GET_ENCODER, '', 'I')
+    def cmd_get_encoder(self):
+        return self.encoder
 
-    @SerialSim.command(39, '', 'BBI')
+    @SerialSim.command(CMD.ID_CONFIG, '', 'BBI')
     def cmd_idconfig(self):
         return self.hw_ver, self.fw_ver, self.dev_id
 
-    @SerialSim.command(36, 'B', 'BHh')
+    @SerialSim.command(CMD.GET_CALIB, 'B', 'BHh')
     def cmd_getcalib(self, index):
         if not 0 <= index <= NCALIB:
             raise ValueError("Invalid calibration index")
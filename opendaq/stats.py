@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+
+# Copyright 2016
+# Ingen10 Ingenieria SL
+#
+# This file is part of opendaq.
+#
+# opendaq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# opendaq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with opendaq.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+from collections import defaultdict
+from .common import CRCError, LengthError
+
+NBUCKETS = 24   # latency buckets, up to 2**23 us (~8 s)
+
+
+class LatencyHistogram(object):
+    """Histogram of round-trip times, with logarithmic buckets.
+
+    Bucket ``k`` counts the latencies below ``2**k`` microseconds (and not
+    below ``2**(k-1)``); the last bucket also holds the longer ones.
+    """
+    def __init__(self):
+        self.buckets = [0]*NBUCKETS
+        self.count = 0
+        self.total = 0.
+
+    def add(self, seconds):
+        """Add a round-trip time (seconds)."""
+        us = int(seconds*1e6)
+        self.buckets[min(us.bit_length(), NBUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+
+    @property
+    def mean(self):
+        """Average round-trip time (seconds)."""
+        return self.total/self.count if self.count else 0.
+
+    def as_dict(self):
+        return {'count': self.count, 'mean': self.mean,
+                'buckets': list(self.buckets)}
+
+
+class LinkStats(object):
+    """Counters of the traffic between the host and an openDAQ.
+
+    Counters are plain integers, updated without locking, so they are cheap
+    enough to be always enabled.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Set all the counters to zero."""
+        self.commands = 0
+        self.naks = 0
+        self.length_errors = 0
+        self.crc_errors = 0
+        self.retries = 0
+        self.retry_failures = 0
+        self.disconnects = 0
+        self.reconnects = 0
+        self.stream_bytes = 0
+        self.channel_bytes = defaultdict(int)
+        self.channel_packets = defaultdict(int)
+        self.latency = defaultdict(LatencyHistogram)
+        self.reader_busy = 0.
+        self.reader_time = 0.
+
+    def command_done(self, ncmd, seconds):
+        """Count a command whose response arrived after some time."""
+        self.latency[ncmd].add(seconds)
+
+    def command_error(self, error):
+        """Count a failed command by the exception it raised."""
+        if isinstance(error, CRCError):
+            self.crc_errors += 1
+        elif isinstance(error, LengthError):
+            self.length_errors += 1
+        elif isinstance(error, IOError):
+            self.naks += 1
+
+    def packet(self, ch, nvalues):
+        """Count a stream packet carrying some values."""
+        self.channel_packets[ch] += 1
+        self.channel_bytes[ch] += 2*nvalues
+
+    def as_dict(self):
+        """Snapshot of the counters, as a dictionary of plain values."""
+        return {
+            'commands': self.commands,
+            'naks': self.naks,
+            'length_errors': self.length_errors,
+            'crc_errors': self.crc_errors,
+            'retries': self.retries,
+            'retry_failures': self.retry_failures,
+            'disconnects': self.disconnects,
+            'reconnects': self.reconnects,
+            'stream_bytes': self.stream_bytes,
+            'channel_bytes': dict(self.channel_bytes),
+            'channel_packets': dict(self.channel_packets),
+            'latency': dict((ncmd, h.as_dict())
+                            for ncmd, h in self.latency.items()),
+            'reader_busy': self.reader_busy,
+            'reader_load': (self.reader_busy/self.reader_time
+                            if self.reader_time else 0.),
+        }
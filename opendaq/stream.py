@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+
+# Copyright 2016
+# Ingen10 Ingenieria SL
+#
+# This file is part of opendaq.
+#
+# opendaq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# opendaq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with opendaq.  If not, see <http://www.gnu.org/licenses/>.
+
+import struct
+from collections import deque
+from .common import CMD, NAK
+
+START_BYTE = 0x7e
+ESCAPE_BYTES = (0x7d, 0x7e)
+
+
+class StreamParser(object):
+    """Incremental parser of the stream packets sent by the openDAQ.
+
+    Bytes can be fed in chunks of any size; complete packets are returned
+    as soon as they are available. Packets with an unknown command are
+    discarded and counted in :attr:`errors`.
+
+    Responses to commands sent while streaming are separated from the
+    stream packets: once a response is announced with :meth:`expect`, the
+    bytes found between packets are collected and appended to
+    :attr:`responses`. A response never starts with the start byte, as its
+    first byte is the high byte of the checksum of a short packet.
+    """
+    def __init__(self):
+        self.errors = 0
+        self.responses = deque()
+        self.__expected = deque()
+        self.__reply = None
+        self.__head = bytearray()
+        self.__body = bytearray()
+        self.__escape = False
+        self.__synced = False
+
+    def expect(self, length):
+        """Announce that a command response of a given length will arrive."""
+        self.__expected.append(length)
+
+    def cancel(self, index=0):
+        """Forget an announced response that will not arrive.
+
+        :param index: Position of the response among the ones still
+            expected (0: the next one).
+        """
+        if index == 0:
+            self.__reply = None     # drop the bytes collected so far
+        del self.__expected[index]
+
+    def feed(self, data):
+        """Process a chunk of bytes.
+
+        :param data: Bytes read from the serial port.
+        :returns: List of (channel, data) tuples, data being None for the
+            packets that signal the end of an experiment.
+        """
+        data = bytearray(data)
+        packets = []
+        pos = 0
+        n = len(data)
+
+        while pos < n:
+            if self.__reply is not None:
+                pos = self.__read_reply(data, pos)
+                continue
+
+            if not self.__synced:
+                if self.__expected and data[pos] != START_BYTE:
+                    self.__reply = bytearray()
+                    continue
+
+                # wait for a start byte (Python 2 only finds substrings)
+                pos = data.find(bytearray([START_BYTE]), pos)
+                if pos < 0:
+                    break
+                pos += 1
+                self.__synced = True
+
+            if len(self.__head) < 5:
+                k = min(5 - len(self.__head), n - pos)
+                self.__head += data[pos:pos + k]
+                pos += k
+                if len(self.__head) < 5:
+                    break
+
+            _, cmd, size, ch = struct.unpack('!HBBB', self.__head)
+            if cmd == CMD.STREAM_DATA:
+                pos = self.__read_body(data, pos, size - 1)
+                if len(self.__body) < size - 1:
+                    break
+                body = self.__body[3:]
+                packets.append((ch, struct.unpack('!%dh' % (len(body)//2),
+                                                  body[:len(body) & ~1])))
+            elif cmd == CMD.STREAM_STOP:
+                packets.append((ch, None))
+            else:
+                self.errors += 1
+
+            self.__head = bytearray()
+            self.__body = bytearray()
+            self.__synced = False
+
+        return packets
+
+    def __read_reply(self, data, pos):
+        """Collect the bytes of a command response until it is complete."""
+        length = self.__expected[0]
+        k = min(length - len(self.__reply), len(data) - pos)
+        self.__reply += data[pos:pos + k]
+        if len(self.__reply) == length or self.__reply == NAK:
+            self.responses.append(self.__reply)
+            self.__expected.popleft()
+            self.__reply = None
+        return pos + k
+
+    def __read_body(self, data, pos, size):
+        """Unescape the bytes of a packet body until it is complete."""
+        need = size - len(self.__body)
+        chunk = data[pos:pos + need]
+        if not self.__escape and ESCAPE_BYTES[0] not in chunk and \
+                ESCAPE_BYTES[1] not in chunk:
+            self.__body += chunk
+            return pos + len(chunk)
+
+        n = len(data)
+        while pos < n and len(self.__body) < size:
+            b = data[pos]
+            pos += 1
+            if self.__escape:
+                self.__body.append(b ^ 0x20)
+                self.__escape = False
+            elif b in ESCAPE_BYTES:
+                self.__escape = True
+            else:
+                self.__body.append(b)
+        return pos
+
+
+def stream_packet(ch, data=None):
+    """Build a stream packet, the way the openDAQ firmware does.
+
+    :param ch: Number of the DataChannel.
+    :param data: Sequence of signed 16-bit values, or None for a stop packet.
+    :returns: Packet bytes, including the start byte.
+    """
+    if data is None:
+        head = bytearray([CMD.STREAM_STOP, 1, ch])
+        return bytearray([START_BYTE]) + struct.pack('!H', sum(head)) + head
+
+    body = bytearray(3) + struct.pack('!%dh' % len(data), *data)
+    head = bytearray([CMD.STREAM_DATA, 4 + 2*len(data), ch])
+    csum = struct.pack('!H', sum(head + body) % 65536)
+
+    escaped = bytearray()
+    for b in body:
+        if b in ESCAPE_BYTES:
+            escaped += bytearray([ESCAPE_BYTES[0], b ^ 0x20])
+        else:
+            escaped.append(b)
+    return bytearray([START_BYTE]) + csum + head + escaped
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+
+# Copyright 2016
+# Ingen10 Ingenieria SL
+#
+# This file is part of opendaq.
+#
+# opendaq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# opendaq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with opendaq.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import print_function
+import time
+import array
+from threading import Lock
+from enum import IntEnum
+from .common import bytes2hex
+
+
+class TraceKind(IntEnum):
+    """Direction of a traced frame."""
+    SEND = 0
+    RECV = 1
+    STREAM = 2
+
+
+class Tracer(object):
+    """Base class of the trace hooks of a :class:`.DAQ`.
+
+    Hooks receive the raw bytes written to or read from the serial port:
+    commands (:meth:`on_send`), command responses (:meth:`on_recv`) and the
+    chunks of stream data read while an experiment is running
+    (:meth:`on_stream_packet`). They are called from the I/O path, so they
+    must return quickly.
+    """
+    def on_send(self, data):
+        pass
+
+    def on_recv(self, data):
+        pass
+
+    def on_stream_packet(self, data):
+        pass
+
+
+class PrintTracer(Tracer):
+    """Hexdump all the traffic to stdout (the ``debug`` mode of the DAQ)."""
+    def on_send(self, data):
+        print("SENT:", bytes2hex(bytearray(data)))
+
+    def on_recv(self, data):
+        print("RECV:", bytes2hex(bytearray(data)))
+
+    def on_stream_packet(self, data):
+        print("STRM:", bytes2hex(bytearray(data)))
+
+
+class TraceRing(Tracer):
+    """Binary capture of the traffic in preallocated buffers.
+
+    Frames are copied into a circular byte buffer, and their timestamps,
+    kinds and positions into circular index arrays, so tracing allocates
+    nothing per frame. The oldest frames are overwritten when any of the
+    buffers is full. Frames may be recorded from several threads.
+
+    :param size: Size of the byte buffer.
+    :param nframes: Maximum number of frames kept.
+    """
+    def __init__(self, size=1 << 20, nframes=1 << 16):
+        self.size = size
+        self.nframes = nframes
+        self.buf = bytearray(size)
+        self.times = array.array('d', [0.])*nframes
+        self.kinds = array.array('B', [0])*nframes
+        # byte offsets, as doubles: Python 2 has no 'q' arrays
+        self.starts = array.array('d', [0.])*nframes
+        self.lengths = array.array('L', [0])*nframes
+        self.nbytes = 0     # total bytes recorded
+        self.count = 0      # total frames recorded
+        self.lock = Lock()
+
+    def record(self, kind, data):
+        """Store a frame.
+
+        :param kind: A :class:`TraceKind`.
+        :param data: Raw bytes.
+        """
+        t = time.time()
+        with self.lock:
+            n = len(data)
+            if n > self.size:
+                data = data[n - self.size:]
+                self.nbytes += n - self.size
+                n = self.size
+
+            pos = self.nbytes % self.size
+            k = min(n, self.size - pos)
+            self.buf[pos:pos + k] = data[:k]
+            self.buf[:n - k] = data[k:]
+
+            i = self.count % self.nframes
+            self.times[i] = t
+            self.kinds[i] = kind
+            self.starts[i] = self.nbytes
+            self.lengths[i] = n
+            self.nbytes += n
+            self.count += 1
+
+    def on_send(self, data):
+        self.record(TraceKind.SEND, data)
+
+    def on_recv(self, data):
+        self.record(TraceKind.RECV, data)
+
+    def on_stream_packet(self, data):
+        self.record(TraceKind.STREAM, data)
+
+    def clear(self):
+        """Forget all the recorded frames."""
+        with self.lock:
+            self.nbytes = 0
+            self.count = 0
+
+    def dump(self):
+        """Frames still held in the buffers, oldest first.
+
+        :returns: List of (timestamp, kind, data) tuples.
+        """
+        with self.lock:
+            ret = []
+            for j in range(max(0, self.count - self.nframes), self.count):
+                i = j % self.nframes
+                start, n = int(self.starts[i]), self.lengths[i]
+                if start < self.nbytes - self.size:
+                    continue    # overwritten
+                pos = start % self.size
+                data = self.buf[pos:pos + n]
+                if len(data) < n:
+                    data += self.buf[:n - len(data)]
+                ret.append((self.times[i], TraceKind(self.kinds[i]),
+                            bytes(data)))
+            return ret
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+
+# Copyright 2016
+# Ingen10 Ingenieria SL
+#
+# This file is part of opendaq.
+#
+# opendaq is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# opendaq is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with opendaq.  If not, see <http://www.gnu.org/licenses/>.
+
+from __future__ import division
+from enum import IntEnum
+from threading import Lock
+import numpy as np
+
+
+class TriggerCondition(IntEnum):
+    """Valid software trigger conditions."""
+    RISING = 0
+    FALLING = 1
+    ABOVE = 2
+    BELOW = 3
+
+
+class SoftTrigger(object):
+    """Host-side trigger evaluated on the points of a stream experiment.
+
+    Every time the condition is met, a segment of ``pre + post`` points is
+    captured: ``pre`` points taken from the history before the trigger and
+    ``post`` points starting at the trigger point. Segments are stored in a
+    preallocated array of shape ``(nsegments, pre + post)``.
+
+    Edge conditions need the signal to cross back through the hysteresis
+    band (``level -/+ hysteresis``) before they can fire again. Level
+    conditions fire whenever the condition holds and no segment is being
+    captured.
+
+    :param level: Trigger level (volts).
+    :param condition: Trigger condition (use :class:`.TriggerCondition`).
+    :param hysteresis: Re-arm band of the edge conditions (volts).
+    :param pre: Number of points captured before the trigger.
+    :param post: Number of points captured from the trigger on.
+    :param nsegments: Number of segments to capture.
+    :raises: ValueError
+    """
+    def __init__(self, level, condition=TriggerCondition.RISING,
+                 hysteresis=0., pre=0, post=100, nsegments=1):
+        if not type(condition) is TriggerCondition:
+            raise ValueError("Invalid trigger condition")
+        if hysteresis < 0:
+            raise ValueError("Invalid hysteresis")
+        if pre < 0 or post < 1:
+            raise ValueError("Invalid segment length")
+        if nsegments < 1:
+            raise ValueError("Invalid number of segments")
+
+        self.level = level
+        self.condition = condition
+        self.hysteresis = hysteresis
+        self.pre = pre
+        self.post = post
+
+        self.segments = np.empty((nsegments, pre + post))
+        self.positions = np.empty(nsegments, dtype=np.int64)
+        self.mutex = Lock()
+        self.reset()
+
+    def reset(self):
+        """Discard the captured segments and re-arm the trigger."""
+        self.count = 0          # completed segments
+        self.nread = 0          # segments already returned by read()
+        self.npoints = 0        # points processed so far
+        self.__history = np.empty(0)
+        self.__state = 0        # last edge event (1: armed, 2: fired)
+        self.__remaining = 0    # points missing in the current segment
+        self.__busy_until = 0   # first point index able to trigger again
+
+    @property
+    def is_full(self):
+        """True when all the segments have been captured."""
+        return self.count == len(self.segments)
+
+    def __edge_candidates(self, x):
+        """Return the indexes of ``x`` where an edge condition fires."""
+        if self.condition == TriggerCondition.RISING:
+            arm = x <= self.level - self.hysteresis
+            fire = x >= self.level
+        else:
+            arm = x >= self.level + self.hysteresis
+            fire = x <= self.level
+
+        events = np.where(arm, 1, np.where(fire, 2, 0))
+        events = np.concatenate(([self.__state], events))
+
+        # forward-fill the last event seen before every point
+        idx = np.where(events != 0, np.arange(len(events)), 0)
+        np.maximum.accumulate(idx, out=idx)
+        previous = events[idx[:-1]]
+
+        if idx[-1] > 0:
+            self.__state = events[idx[-1]]
+        return np.flatnonzero(fire & (previous == 1))
+
+    def process(self, points):
+        """Evaluate the trigger on a new block of points.
+
+        :param points: Sequence of values (volts).
+        :returns: Number of segments completed by this block.
+        """
+        x = np.asarray(points, dtype=float)
+        n = len(x)
+        if n == 0 or self.is_full:
+            return 0
+
+        with self.mutex:
+            completed = self.count
+            start = self.npoints
+            buf = np.concatenate((self.__history, x))
+            offset = len(self.__history)
+
+            # complete the segment that was left open by the previous block
+            if self.__remaining:
+                k = min(self.__remaining, n)
+                end = self.pre + self.post - self.__remaining
+                self.segments[self.count, end:end + k] = x[:k]
+                self.__remaining -= k
+                if not self.__remaining:
+                    self.count += 1
+
+            if self.condition in (TriggerCondition.ABOVE,
+                                  TriggerCondition.BELOW):
+                if self.condition == TriggerCondition.ABOVE:
+                    candidates = np.flatnonzero(x >= self.level)
+                else:
+                    candidates = np.flatnonzero(x <= self.level)
+            else:
+                candidates = self.__edge_candidates(x)
+
+            i = np.searchsorted(candidates, self.__busy_until - start)
+            while i < len(candidates) and not self.__remaining and \
+                    not self.is_full:
+                k = candidates[i]
+                seg = self.segments[self.count]
+
+                # pre-trigger points (NaN if the history is too short)
+                first = offset + k - self.pre
+                if first < 0:
+                    seg[:-first] = np.nan
+                    seg[-first:self.pre] = buf[:offset + k]
+                else:
+                    seg[:self.pre] = buf[first:offset + k]
+
+                post = x[k:k + self.post]
+                seg[self.pre:self.pre + len(post)] = post
+                self.positions[self.count] = start + k
+                self.__remaining = self.post - len(post)
+                self.__busy_until = start + k + self.post
+                if not self.__remaining:
+                    self.count += 1
+
+                i = np.searchsorted(candidates, self.__busy_until - start)
+
+            if self.pre:
+                self.__history = buf[-self.pre:]
+            self.npoints += n
+            return self.count - completed
+
+    def read(self):
+        """Return the segments completed since the last call.
+
+        :returns:
+            - positions: Index of the trigger point of every segment.
+            - segments: Array of shape ``(n, pre + post)``.
+        """
+        with self.mutex:
+            first, self.nread = self.nread, self.count
+            return (self.positions[first:self.count].copy(),
+                    self.segments[first:self.count].copy())
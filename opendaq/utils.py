@@ -10,10 +10,16 @@ import json
 from terminaltables import AsciiTable
 from . import usbtmc
 from .daq import DAQ
+from .experiment import ExpMode
 from .daq_model import CalibReg, DAQModel
 
 log_formatter = logging.Formatter("%(message)s")
 
+STREAM_PERIODS = [20, 10, 5, 2, 1]          # ms
+BURST_PERIODS = [1000, 500, 200, 100]       # us
+LOSS_LIMIT = 0.01   # highest sample loss of a sustainable rate
+MAX_POINTS = 65535  # points of an experiment
+
 
 class ExpectedValuesTable(AsciiTable):
     '''A custom AsciiTable for printing calibration results'''
@@ -474,6 +480,118 @@ class CalibDAQ(DAQ):
             f.close()
 
 
+def measure_latency(daq, n=200):
+    """Measure the round-trip time of some commands.
+
+    :param daq: A :class:`.DAQ` object.
+    :param n: Number of commands of every kind.
+    :returns: Dictionary with the round-trip times (seconds), by command.
+    """
+    commands = [('AIN', daq.read_adc), ('PIO', lambda: daq.read_pio(1))]
+    ret = {}
+    for name, command in commands:
+        times = np.empty(n)
+        for i in range(n):
+            t0 = time.time()
+            command()
+            times[i] = time.time() - t0
+        ret[name] = times
+    return ret
+
+
+def measure_stream(daq, period, nchannels=1, duration=1., burst=False):
+    """Measure the sample loss of an acquisition.
+
+    The experiments acquire the points of the given duration, and the loss
+    is the fraction of them that never arrived.
+
+    :param daq: A :class:`.DAQ` object.
+    :param period: Sampling period (ms for streams, us for a burst).
+    :param nchannels: Number of Stream experiments.
+    :param duration: Duration of the acquisition (seconds).
+    :param burst: Use a Burst experiment instead of streams.
+    :returns: Dictionary with the sampling rate of every channel (Hz), and
+        the expected and received number of samples.
+    """
+    rate = 1e6/period if burst else 1e3/period
+    npoints = max(1, min(int(duration*rate), MAX_POINTS))
+
+    daq.clear_experiments()
+    if burst:
+        exps = [daq.create_burst(ExpMode.ANALOG_IN, period, npoints=npoints,
+                                 buffersize=20000)]
+    else:
+        exps = [daq.create_stream(ExpMode.ANALOG_IN, period, npoints=npoints,
+                                  buffersize=20000)
+                for _ in range(nchannels)]
+    for e in exps:
+        e.analog_setup(gain=0)     # valid for single-ended inputs of any model
+
+    # lost packets may keep the experiments from finishing
+    deadline = time.time() + 2*npoints/rate + 1
+    daq.start(check=None)
+    while daq.is_measuring and time.time() < deadline:
+        time.sleep(0.1)
+        for e in exps:
+            e.read()
+    daq.stop()
+    daq.clear_experiments()
+
+    expected = npoints*len(exps)
+    received = sum(e.total_points for e in exps)
+    return {'rate': rate, 'expected': expected, 'received': received,
+            'loss': max(0., 1 - received/float(expected))}
+
+
+def bench_cmd(args):
+    daq = DAQ(args.port)
+
+    logging.info(title("Command round-trip time"))
+    latency = measure_latency(daq, args.number)
+    rows = [['Command', 'Min (ms)', 'Median (ms)', '99% (ms)', 'Max (ms)']]
+    for name, times in sorted(latency.items()):
+        rows.append([name] + ['%.2f' % (1e3*v) for v in (
+            times.min(), np.median(times), np.percentile(times, 99),
+            times.max())])
+    logging.info(AsciiTable(rows).table)
+
+    logging.info(title("Acquisition rate"))
+    tests = [('Stream', n, p) for n in range(1, 5) for p in STREAM_PERIODS]
+    tests += [('Burst', 1, p) for p in BURST_PERIODS]
+    rows = [['Mode', 'Channels', 'Period', 'Rate (Hz)', 'Loss', '']]
+    results = []
+    for mode, nchannels, period in tests:
+        r = measure_stream(daq, period, nchannels, args.time,
+                           burst=(mode == 'Burst'))
+        r.update(mode=mode, channels=nchannels, period=period)
+        results.append(r)
+        unit = 'us' if mode == 'Burst' else 'ms'
+        rows.append([mode, nchannels, '%d %s' % (period, unit),
+                     '%g' % r['rate'], '%.1f%%' % (100*r['loss']),
+                     'OK' if r['loss'] <= LOSS_LIMIT else 'LOSS'])
+    logging.info(AsciiTable(rows).table)
+
+    logging.info(title("Maximum sustainable rate"))
+    rows = [['Mode', 'Channels', 'Rate per channel (Hz)']]
+    for mode, nchannels in sorted(set((r['mode'], r['channels'])
+                                      for r in results)):
+        rates = [r['rate'] for r in results if r['mode'] == mode and
+                 r['channels'] == nchannels and r['loss'] <= LOSS_LIMIT]
+        rows.append([mode, nchannels, '%g' % max(rates) if rates else '-'])
+    logging.info(AsciiTable(rows).table)
+
+    if args.json:
+        data = {
+            'latency': dict((name, times.tolist())
+                            for name, times in latency.items()),
+            'stream': results,
+        }
+        f = open('%s_%s_bench.json' % (daq.serial_str,
+                                       time.strftime('%y%m%d')), 'w')
+        json.dump(data, f, indent=2)
+        f.close()
+
+
 def info_cmd(args):
     daq = CalibDAQ(args.port)
     logging.info(daq)
@@ -621,6 +739,19 @@ def main():
                          help='Write a new serial number')
     sparser.set_defaults(func=serial_cmd)
 
+    # 'bench' command parser
+    bparser = subparsers.add_parser('bench', help='Measure the command '
+                                    'latency and the acquisition rates')
+    bparser.add_argument('-n', '--number', type=int, default=200,
+                         help='Commands sent to measure the latency '
+                         '(default: 200)')
+    bparser.add_argument('-t', '--time', type=float, default=1.,
+                         help='Duration of every acquisition in seconds '
+                         '(default: 1)')
+    bparser.add_argument('-j', '--json', action='store_true',
+                         help='Generate json file')
+    bparser.set_defaults(func=bench_cmd)
+
     args = parser.parse_args()
     if 'func' in args:
         args.func(args)
@@ -17,7 +17,7 @@ timers and counters.
 
 requires = ['pyserial', 'numpy', 'terminaltables']
 if sys.version_info[0] == 2:
-    requires.append('enum34')
+    requires.extend(['enum34', 'futures', 'selectors34'])
 
 
 setup(
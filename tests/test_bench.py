@@ -0,0 +1,55 @@
+import unittest
+from opendaq import bench
+
+
+class TestBench(unittest.TestCase):
+    def test_run(self):
+        results = bench.run(number=1, repeat=2)
+        assert len(results) == len(bench._benchmarks)
+        for r in results.values():
+            assert r['number'] == 1 and len(r['times']) == 2
+            assert r['min'] <= r['mean'] and r['rate'] > 0
+
+    def test_filter(self):
+        results = bench.run(['crc', 'mkcmd'], number=1, repeat=1)
+        assert sorted(results) == ['crc', 'mkcmd']
+
+    def test_measure(self):
+        number, times = bench.measure(lambda: None, repeat=3)
+        assert number > 1 and len(times) == 3
+
+    def test_save_load(self):
+        import shutil
+        import tempfile
+        directory = tempfile.mkdtemp()
+        try:
+            results = bench.run(['crc'], number=1, repeat=2)
+            info, loaded = bench.load(bench.save(results, directory))
+            assert loaded == results
+            assert info['opendaq'] == bench.__version__
+        finally:
+            shutil.rmtree(directory)
+
+    def test_compare(self):
+        def results(times):
+            return {'crc': {'times': times}}
+
+        base = results([1.0, 1.01, 0.99, 1.0, 1.02])
+        rows = bench.compare(base, results([1.5, 1.52, 1.49, 1.51, 1.5]))
+        assert rows[0][0] == 'crc' and rows[0][5] == 'slower'
+        assert abs(rows[0][3] - 0.5) < 0.02
+
+        rows = bench.compare(base, results([0.5, 0.51, 0.49, 0.5, 0.5]))
+        assert rows[0][5] == 'faster'
+
+        # within the noise or below the threshold
+        rows = bench.compare(base, results([1.1, 0.9, 1.05, 0.95, 1.0]))
+        assert rows[0][5] == ''
+        rows = bench.compare(base, results([1.02, 1.03, 1.01, 1.02, 1.04]))
+        assert rows[0][5] == ''
+
+    def test_welch(self):
+        t, dof = bench.welch([1, 2, 3], [1, 2, 3])
+        assert t == 0 and dof == 4
+        assert bench.t_critical(4) == 3.747
+        assert bench.t_critical(float('inf')) == bench.T_INF
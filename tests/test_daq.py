@@ -1,5 +1,21 @@
 import unittest
-from opendaq import DAQ, LedColor
+import numpy as np
+from opendaq import DAQ, LedColor, ExpMode
+from opendaq.common import mkcmd, CRCError
+from opendaq.daq import CMD
+from opendaq.retry import RetryPolicy
+
+
+def sent_commands(writes):
+    """Numbers of the commands in a list of written packets."""
+    ret = []
+    for data in writes:
+        data = bytearray(data)
+        pos = 0
+        while pos < len(data):
+            ret.append(data[pos + 2])
+            pos += 4 + data[pos + 3]
+    return ret
 
 
 class TestDAQ(unittest.TestCase):
@@ -39,3 +55,243 @@ class TestDAQ(unittest.TestCase):
             assert self.sim.pios_dir[pio] == 1
             self.daq.set_pio_dir(pio + 1, 0)
             assert self.sim.pios_dir[pio] == 0
+
+    def test_read_frames(self):
+        s1 = self.daq.create_stream(ExpMode.ANALOG_IN, 10, continuous=True)
+        s2 = self.daq.create_stream(ExpMode.ANALOG_IN, 20, continuous=True,
+                                    buffersize=2)
+        s1.add_points([0, 1, 2])
+        s2.add_points([10])
+        t, frames = self.daq.read_frames()
+        assert list(t) == [0, 0.01]
+        assert frames.tolist() == [[0, 10], [1, 10]]
+
+        s1.add_points([3, 4, 5, 6])
+        s2.add_points([11, 12, 13])  # the first point is lost
+        t, frames = self.daq.read_frames()
+        assert list(t) == [0.02, 0.03, 0.04, 0.05, 0.06]
+        assert frames[:, 0].tolist() == [2, 3, 4, 5, 6]
+        assert np.isnan(frames[0, 1]) and np.isnan(frames[1, 1])
+        assert frames[2:, 1].tolist() == [12, 12, 13]
+
+        # the frame cursor is shared by all the calls
+        self.assertRaises(ValueError, self.daq.read_frames, [s1])
+
+    def test_read_frames_error(self):
+        self.daq.create_stream(ExpMode.ANALOG_IN, 10)
+        self.daq.create_stream(ExpMode.ANALOG_IN, 15)
+        self.assertRaises(ValueError, self.daq.read_frames)
+
+    def test_read_frames_output(self):
+        s1 = self.daq.create_stream(ExpMode.ANALOG_IN, 10, continuous=True)
+        s2 = self.daq.create_stream(ExpMode.ANALOG_OUT, 10, continuous=True)
+        s1.add_points([0, 1, 2])
+
+        # output experiments are left out of the default set
+        t, frames = self.daq.read_frames()
+        assert frames.tolist() == [[0], [1], [2]]
+        self.assertRaises(ValueError, self.daq.read_frames, [s1, s2])
+
+    def test_send_commands(self):
+        commands = [(mkcmd(3, 'BB', i + 1, i % 2), 'BB') for i in range(6)]
+        commands.append((mkcmd(39, ''), 'BBI'))
+        ret = self.daq.send_commands(commands)
+        assert ret[:6] == [(i + 1, i % 2) for i in range(6)]
+        assert self.sim.pios == [0, 1, 0, 1, 0, 1, 0]
+        assert ret[6] == self.daq.get_info()
+
+    def test_scan(self):
+        values = self.daq.scan(range(1, 9), nsamples=10, repeat=3)
+        assert values.shape == (3, 8)
+        assert self.sim.adc_pinput == 8
+        assert self.sim.adc_nsamples == 10
+        assert np.all(abs(values) <= 12.)
+
+        self.assertRaises(ValueError, self.daq.scan, [1, 2], gains=[0])
+        self.assertRaises(ValueError, self.daq.scan, [9])
+
+    def test_spi_transfer(self):
+        data = bytearray(range(256))
+        received, rate = self.daq.spi_transfer(data)
+        assert received == data and rate > 0
+        assert self.daq.spi_write(0x12) == 0x12
+
+        received, _ = self.daq.spi_transfer(b'\x12\x34\x56\x78', word=True)
+        assert received == bytearray(b'\x12\x34\x56\x78')
+        self.assertRaises(ValueError, self.daq.spi_transfer, b'\x00', True)
+
+    def test_eeprom(self):
+        self.sim.eeprom[:] = bytearray(range(254))
+        assert self.daq.read_eeprom_block(10, 100) == bytearray(range(10, 110))
+
+        self.sim.eeprom[20] = 0
+        assert self.daq.read_eeprom(20) == 20   # served from the cache
+        assert self.daq.read_eeprom_block(20, 1, cached=False)[0] == 0
+        self.sim.eeprom[21] = 0
+        self.daq.clear_eeprom_cache()
+        assert self.daq.read_eeprom(21) == 0
+
+        self.daq.write_eeprom_block(200, b'opendaq')
+        assert self.sim.eeprom[200:207] == bytearray(b'opendaq')
+        assert self.daq.write_eeprom(0, 0xff) == (0, 1, 0xff)
+        assert self.sim.eeprom[0] == 0xff
+        assert self.daq.read_eeprom_block(0, 254) == self.sim.eeprom
+
+        self.assertRaises(ValueError, self.daq.read_eeprom_block, 250, 10)
+        self.assertRaises(ValueError, self.daq.read_eeprom, 254)
+
+    def test_signal_cache(self):
+        writes = []
+        write = self.sim.write
+        self.sim.write = lambda data: writes.append(data) or write(data)
+
+        def cycle(s, signal):
+            del writes[:]
+            s.load_signal(signal)
+            self.daq.start(check=None)
+            assert self.daq.stop()
+            return sent_commands(writes).count(CMD.SIGNAL_LOAD)
+
+        signal = np.linspace(0, 2, 300)
+        s = self.daq.create_stream(ExpMode.ANALOG_OUT, 10, npoints=0,
+                                   continuous=True)
+        assert cycle(s, signal) == 6
+        raw = self.sim.model.volts_to_raw(signal, 0)
+        assert self.sim.signal == list(raw)
+
+        # an unchanged waveform is not sent again
+        assert cycle(s, signal) == 0
+
+        signal = np.linspace(2, 0, 40)
+        assert cycle(s, signal) == 1
+        assert self.sim.signal[:40] == list(self.sim.model.volts_to_raw(
+            signal, 0))
+
+        # the device forgets the waveform with the channel
+        self.daq.clear_experiments()
+        s = self.daq.create_stream(ExpMode.ANALOG_OUT, 10, npoints=0,
+                                   continuous=True)
+        assert cycle(s, signal) == 1
+
+    def test_stats(self):
+        self.daq.reset_stats()
+        self.daq.set_pio(1, 1)
+        self.daq.send_commands([(mkcmd(3, 'B', 1), 'BB')]*3)
+        self.assertRaises(IOError, self.daq.send_command, mkcmd(99, ''), '')
+        self.daq.create_stream(ExpMode.ANALOG_IN, 10)
+
+        stats = self.daq.stats()
+        assert stats['commands'] == 5 and stats['naks'] == 1
+        assert stats['latency'][3]['count'] == 4
+        assert sum(stats['latency'][3]['buckets']) == 4
+        assert stats['buffer_fill'] == {1: 0.}
+
+
+class TestDAQRetry(unittest.TestCase):
+    def setUp(self):
+        self.daq = DAQ('sim', retry=RetryPolicy(backoff=0))
+        self.daq.reset_stats()
+        self.sim = self.daq.ser
+        self.corrupt = 0
+        read = self.sim.read
+
+        def corrupt_read(size=1):
+            data = bytearray(read(size))
+            if self.corrupt and data:
+                self.corrupt -= 1
+                data[-1] ^= 0xff
+            return data
+        self.sim.read = corrupt_read
+
+    def tearDown(self):
+        self.daq.close()
+
+    def test_retry(self):
+        self.daq.set_pio(1, 1)
+        self.corrupt = 1
+        assert self.daq.read_pio(1) == 1
+        stats = self.daq.stats()
+        assert stats['retries'] == 1 and stats['crc_errors'] == 1
+
+    def test_attempts(self):
+        self.corrupt = 5
+        self.assertRaises(CRCError, self.daq.read_pio, 1)
+        stats = self.daq.stats()
+        assert stats['retries'] == 2 and stats['retry_failures'] == 1
+
+    def test_not_idempotent(self):
+        self.daq.set_retry(RetryPolicy(commands=[]))
+        self.corrupt = 1
+        self.assertRaises(CRCError, self.daq.read_pio, 1)
+        assert self.daq.stats()['retries'] == 0
+
+
+class TestDAQShadow(unittest.TestCase):
+    def setUp(self):
+        self.daq = DAQ('sim', shadow=True)
+        self.sim = self.daq.ser
+        self.writes = []
+        write = self.sim.write
+        self.sim.write = lambda data: self.writes.append(data) or write(data)
+
+    def tearDown(self):
+        self.daq.close()
+
+    def test_redundant_commands(self):
+        for i in range(3):
+            self.daq.set_led(LedColor.RED)
+            self.daq.set_pio_dir(2, 1)
+            self.daq.conf_adc(1, 0, 0, 10)
+        assert len(self.writes) == 3
+        assert self.sim.led_color == LedColor.RED
+        assert self.sim.pios_dir[1] == 1
+
+        self.daq.conf_adc(2, 0, 0, 10)
+        self.daq.set_led(LedColor.GREEN)
+        assert len(self.writes) == 5
+
+    def test_invalidate(self):
+        self.daq.set_led(LedColor.RED)
+        self.daq.invalidate_shadow()
+        self.daq.set_led(LedColor.RED)
+        assert len(self.writes) == 2
+
+        self.daq.set_port_dir(0)
+        self.daq.set_pio_dir(1, 0)
+        self.daq.set_led(LedColor.RED)
+        assert len(self.writes) == 4
+
+    def test_pin_functions(self):
+        self.daq.set_pio_dir(1, 0)
+        self.daq.set_pio_dir(6, 1)
+        self.daq.spi_setup(1)
+        self.daq.init_counter(True)
+        assert self.sim.pios_dir[0] == 1 and self.sim.pios_dir[5] == 0
+
+        # the pins changed their direction: the settings are sent again
+        self.daq.set_pio_dir(1, 0)
+        self.daq.set_pio_dir(6, 1)
+        assert self.sim.pios_dir[0] == 0 and self.sim.pios_dir[5] == 1
+
+    def start_commands(self):
+        """Commands sent by start()."""
+        del self.writes[:]
+        self.daq.start(check=None)
+        ret = sent_commands(self.writes)
+        assert self.daq.stop()
+        return ret
+
+    def test_restart(self):
+        s = self.daq.create_stream(ExpMode.ANALOG_IN, 10, npoints=0,
+                                   continuous=True)
+        s.analog_setup(pinput=2, gain=0)
+        assert self.start_commands() == [
+            CMD.STREAM_CREATE, CMD.CHANNEL_SETUP, CMD.CHANNEL_CFG,
+            CMD.TRIGGER_SETUP, CMD.STREAM_START]
+
+        # the stream configuration is not sent again
+        for i in range(2):
+            assert self.start_commands() == [CMD.STREAM_START]
+
+        self.daq.invalidate_shadow()
+        assert len(self.start_commands()) == 5
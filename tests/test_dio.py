@@ -0,0 +1,47 @@
+import unittest
+from opendaq import DAQ
+
+
+class TestDIOTransaction(unittest.TestCase):
+    def setUp(self):
+        self.daq = DAQ('sim')
+        self.sim = self.daq.ser
+        self.writes = []
+        write = self.sim.write
+        self.sim.write = lambda data: self.writes.append(data) or write(data)
+
+    def tearDown(self):
+        self.daq.close()
+
+    def test_pins(self):
+        with self.daq.dio_transaction() as t:
+            t.set(1, 1)
+            t.set(3, 1)
+            t.set_dir(1, 1)
+            t.set_dir(3, 1)
+        assert len(self.writes) == 1
+        assert self.sim.pios[:4] == [1, 0, 1, 0]
+        assert self.sim.pios_dir[:4] == [1, 0, 1, 0]
+
+    def test_port(self):
+        t = self.daq.dio_transaction()
+        for pin in range(1, 7):
+            t.set(pin, pin % 2)
+        t.set_port_dir(0x3f)
+        t.commit()
+        assert len(self.writes) == 1
+        assert self.sim.pios[:6] == [1, 0, 1, 0, 1, 0]
+        assert self.sim.pios_dir[:6] == [1]*6
+        assert self.writes[0][2] == 7    # a single PORT command
+
+    def test_play(self):
+        self.daq.dio_transaction().play([1, 2, 4, 8], delay=300)
+        assert len(self.writes) == 1
+        assert self.sim.pios[:4] == [0, 0, 0, 1]
+
+    def test_errors(self):
+        t = self.daq.dio_transaction()
+        self.assertRaises(ValueError, t.set, 7, 1)
+        self.assertRaises(ValueError, t.set, 1, 2)
+        self.assertRaises(ValueError, t.set_port, 64)
+        self.assertRaises(ValueError, t.play, [1, 64])
@@ -0,0 +1,79 @@
+import unittest
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+from opendaq import discovery
+from opendaq.discovery import DeviceInfo, discover, find_port, probe
+
+
+def fake_probe(port, **kwargs):
+    if port == '/dev/ttyUSB1':
+        return DeviceInfo(port, 1, '[M]', 140, 123, 'ODM081237')
+
+
+def moved_probe(port, **kwargs):
+    if port == '/dev/ttyUSB2':
+        return DeviceInfo(port, 1, '[M]', 140, 123, 'ODM081237')
+
+
+class TestDiscovery(unittest.TestCase):
+    def setUp(self):
+        discovery._cache.clear()
+        discovery._in_use.clear()
+
+    def test_probe_missing_port(self):
+        assert probe('/dev/does-not-exist', settle=0) is None
+
+    def test_discover(self):
+        ports = ['/dev/ttyUSB0', '/dev/ttyUSB1']
+        with mock.patch('opendaq.discovery.probe',
+                        side_effect=fake_probe) as p:
+            devices = discover(ports)
+            assert [d.port for d in devices] == ['/dev/ttyUSB1']
+            assert p.call_count == 2
+
+            # cached ports are not probed again
+            assert discover(ports) == devices
+            assert p.call_count == 2
+
+            assert find_port('ODM081237', ports=ports) == '/dev/ttyUSB1'
+            assert p.call_count == 2
+
+            # unless asked to confirm them
+            assert find_port('ODM081237', ports=ports,
+                             confirm=True) == '/dev/ttyUSB1'
+            assert p.call_count == 3
+
+            assert find_port('ODM081007', ports=ports) is None
+            assert p.call_count == 5
+
+    def test_find_moved(self):
+        ports = ['/dev/ttyUSB0', '/dev/ttyUSB1', '/dev/ttyUSB2']
+        with mock.patch('opendaq.discovery.probe', side_effect=fake_probe):
+            assert find_port('ODM081237', ports=ports) == '/dev/ttyUSB1'
+        with mock.patch('opendaq.discovery.probe', side_effect=moved_probe):
+            assert find_port('ODM081237', ports=ports) == '/dev/ttyUSB1'
+            assert find_port('ODM081237', ports=ports,
+                             confirm=True) == '/dev/ttyUSB2'
+            assert [d.port for d in discover(ports)] == ['/dev/ttyUSB2']
+
+    def test_in_use(self):
+        ports = ['/dev/ttyUSB0', '/dev/ttyUSB1']
+        with mock.patch('opendaq.discovery.probe',
+                        side_effect=fake_probe) as p:
+            discover(ports)
+            discovery.claim_port('/dev/ttyUSB1')
+            discovery.claim_port('/dev/ttyUSB0')
+
+            # ports opened by this process are never probed
+            assert [d.port for d in discover(ports, refresh=True)] == \
+                ['/dev/ttyUSB1']
+            assert find_port('ODM081237', ports=ports) == '/dev/ttyUSB1'
+            assert find_port('ODM081237', ports=ports, confirm=True) is None
+            assert p.call_count == 2
+
+            discovery.release_port('/dev/ttyUSB1')
+            assert find_port('ODM081237', ports=ports,
+                             confirm=True) == '/dev/ttyUSB1'
+            assert p.call_count == 3
@@ -66,3 +66,13 @@ class TestModelM(unittest.TestCase):
 
         self.assertRaises(ValueError, m.volts_to_raw, 5, 0)
         self.assertRaises(IndexError, m.volts_to_raw, 0, 1)
+
+    def test_volts_to_raw_array(self):
+        m = ModelM(140, 123)
+        m.dac_calib[0] = CalibReg(1.0, -0.1)
+        volts = [0, 4.096, -4.096, 1.5]
+        raw = m.volts_to_raw(volts, 0)
+        assert list(raw) == [m.volts_to_raw(v, 0) for v in volts]
+        assert raw[1] == 32767
+
+        self.assertRaises(ValueError, m.volts_to_raw, [0, 5], 0)
@@ -0,0 +1,79 @@
+import unittest
+import warnings
+from opendaq import DAQ, ExpMode
+from opendaq.common import BandwidthError
+from opendaq.experiment import DAQStream, DAQBurst
+from opendaq.planner import (plan, stream_rate, packet_bytes,
+                             PACKET_SAMPLES)
+
+
+class TestPlanner(unittest.TestCase):
+    def test_rate(self):
+        exps = [DAQStream(ExpMode.ANALOG_IN, 1, 10),
+                DAQStream(ExpMode.ANALOG_IN, 2, 20)]
+        assert stream_rate(exps, 1) == 150*packet_bytes(1)
+        assert stream_rate(exps, 10) == 15*packet_bytes(10)
+        assert stream_rate(exps) == 150/PACKET_SAMPLES*packet_bytes(
+            PACKET_SAMPLES)
+        assert packet_bytes(10) > 29
+
+        exps.append(DAQStream(ExpMode.ANALOG_OUT, 4, 1))
+        assert stream_rate(exps, 1) == 150*packet_bytes(1)
+
+    def test_plan(self):
+        p = plan([DAQStream(ExpMode.ANALOG_IN, 1, 10)], 115200)
+        assert p.load < 0.2 and p.periods == {1: 10}
+
+        exps = [DAQStream(ExpMode.ANALOG_IN, i + 1, 1) for i in range(3)]
+        p = plan(exps, 115200, 1)
+        assert p.load > 1
+        assert plan([DAQStream(ExpMode.ANALOG_IN, i + 1, p.periods[i + 1])
+                     for i in range(3)], 115200, 1).load <= 1
+        assert plan(exps, 115200).load < 1
+
+        p = plan([DAQBurst(ExpMode.ANALOG_IN, 100, continuous=True)],
+                 115200)
+        assert p.load > 1 and p.periods[1] > 100
+
+    def test_buffered(self):
+        # finite bursts that fit in the buffer of the device
+        p = plan([DAQBurst(ExpMode.ANALOG_IN, 200, npoints=500)], 115200)
+        assert p.rate == 0 and p.load == 0 and p.periods == {1: 200}
+
+        p = plan([DAQBurst(ExpMode.ANALOG_IN, 200, npoints=5000)], 115200)
+        assert p.load > 1 and p.periods[1] > 200
+
+    def test_start(self):
+        daq = DAQ('sim')
+        daq.create_stream(ExpMode.ANALOG_IN, 1).analog_setup(gain=0)
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            daq.start()
+            daq.stop()
+            assert not w
+        daq.close()
+
+        daq = DAQ('sim')
+        daq.create_burst(ExpMode.ANALOG_IN, 200,
+                         npoints=500).analog_setup(gain=0)
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            daq.start(check='error')
+            daq.stop()
+            assert not w
+        daq.close()
+
+        daq = DAQ('sim')
+        daq.create_burst(ExpMode.ANALOG_IN, 100,
+                         continuous=True).analog_setup(gain=0)
+        self.assertRaises(BandwidthError, daq.start, check='error')
+
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            try:
+                daq.start()
+                daq.stop()
+            except IOError:
+                pass    # the device can not stream
+            assert issubclass(w[0].category, RuntimeWarning)
+        daq.close()
@@ -0,0 +1,34 @@
+import unittest
+import numpy as np
+from opendaq import DAQ
+from opendaq.poller import Poller
+
+
+class TestPoller(unittest.TestCase):
+    def test_rate(self):
+        p = Poller(lambda: 1, 200)
+        t, values = p.run(20)
+        assert len(t) == 20 and np.all(values == 1)
+        assert abs(p.achieved_rate - 200) < 40
+        assert p.jitter < 0.01
+
+    def test_derivative(self):
+        p = Poller(lambda: 0, 1)
+        p.t = np.array([0., 1., 2.])
+        p.values = np.array([2**32 - 10, 10, 30])
+        t, rate = p.derivative(wrap=2**32)
+        assert list(t) == [0.5, 1.5]
+        assert list(rate) == [20, 20]
+
+    def test_daq_poller(self):
+        daq = DAQ('sim')
+        daq.ser.counter = 10
+        daq.ser.capture_period = 500
+        assert np.all(daq.poller('counter', 1000).run(3)[1] == 10)
+        assert np.all(daq.poller('capture', 1000).run(3)[1] == 500)
+        assert np.all(daq.poller('capture', 1000, mode=0).run(3)[1] == 250)
+        self.assertRaises(ValueError, daq.poller, 'pio', 10)
+        daq.close()
+
+    def test_errors(self):
+        self.assertRaises(ValueError, Poller, lambda: 0, 0)
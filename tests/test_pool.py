@@ -0,0 +1,107 @@
+import time
+import warnings
+import unittest
+from opendaq import DAQPool, ExpMode
+
+
+class TestDAQPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = DAQPool(['sim', 'sim'])
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_devices(self):
+        assert len(self.pool) == 2
+        devices = list(self.pool)
+        assert devices[0] is not devices[1]
+        assert self.pool['sim'] in devices
+        for daq in devices:
+            assert daq.serial_str == devices[0].serial_str
+
+    def test_not_measuring(self):
+        assert not self.pool.is_measuring
+
+    def test_stream(self):
+        streams = []
+        for daq in self.pool:
+            s = daq.create_stream(ExpMode.ANALOG_IN, 5, npoints=20)
+            s.analog_setup(gain=0)
+            streams.append(s)
+        self.pool.start()
+        t0 = time.time()
+        while self.pool.is_measuring and time.time() - t0 < 2:
+            time.sleep(0.01)
+
+        assert not self.pool.is_measuring
+        assert self.pool.stop()
+        assert [len(s.read()) for s in streams] == [20, 20]
+
+    def test_stop(self):
+        streams = []
+        for daq in self.pool:
+            s = daq.create_stream(ExpMode.ANALOG_IN, 5, npoints=0,
+                                  continuous=True)
+            s.analog_setup(gain=0)
+            streams.append(s)
+        self.pool.start()
+        time.sleep(0.05)
+
+        # the stop packets of the second device are lost
+        sim = self.pool.devices[1].ser
+        sim.read = lambda size=1: b''
+        t0 = time.time()
+        assert not self.pool.stop(timeout=0.2)
+        assert time.time() - t0 < 1
+        assert not self.pool.is_measuring
+        assert all(s.total_points > 0 for s in streams)
+
+    def test_stop_blocked(self):
+        for daq in self.pool:
+            s = daq.create_stream(ExpMode.ANALOG_IN, 5, npoints=0,
+                                  continuous=True)
+            s.analog_setup(gain=0)
+        self.pool.start()
+        time.sleep(0.05)
+
+        # the I/O loop is stuck reading the second device
+        sim = self.pool.devices[1].ser
+        sim.read = lambda size=1: time.sleep(1) or b''
+        t0 = time.time()
+        assert not self.pool.stop(timeout=0.2)
+        assert time.time() - t0 < 0.8
+        time.sleep(1)   # let the loop exit before closing the pool
+
+    def test_unplugged(self):
+        streams = []
+        for daq in self.pool:
+            s = daq.create_stream(ExpMode.ANALOG_IN, 5, npoints=0,
+                                  continuous=True)
+            s.analog_setup(gain=0)
+            streams.append(s)
+        self.pool.start()
+        time.sleep(0.05)
+
+        def unplugged(size=1):
+            raise IOError("unplugged")
+
+        self.pool.devices[1].ser.read = unplugged
+        with warnings.catch_warnings(record=True):
+            warnings.simplefilter('always')
+            time.sleep(0.1)
+        assert not self.pool.devices[1].is_measuring
+        assert self.pool.devices[1].stats()['disconnects'] == 1
+
+        # the other device is still served
+        before = streams[0].total_points
+        time.sleep(0.1)
+        assert streams[0].total_points > before
+        assert self.pool.stop(timeout=0.5)
+        assert not self.pool.is_measuring
+
+    def test_virtual_clock(self):
+        pool = DAQPool(['sim'], virtual_clock=True)
+        try:
+            assert pool.devices[0].ser.virtual_clock
+        finally:
+            pool.close()
@@ -0,0 +1,169 @@
+import time
+import unittest
+import warnings
+import serial
+try:
+    from unittest import mock
+except ImportError:
+    import mock
+from opendaq import DAQ, ExpMode, LedColor
+from opendaq import daq as daq_module
+from opendaq import discovery
+from opendaq.discovery import DeviceInfo
+from opendaq.simulator import DAQSimulator
+
+
+class UnpluggableSerial(object):
+    """Simulated device whose port fails while it is unplugged."""
+    def __init__(self):
+        self.sim = DAQSimulator('sim', timeout=1)
+        self.unplugged_until = 0
+
+    def unplug(self, seconds):
+        self.unplugged_until = time.time() + seconds
+
+    def __check(self):
+        if time.time() < self.unplugged_until:
+            raise serial.SerialException("device disconnected")
+
+    def read(self, size=1):
+        self.__check()
+        return self.sim.read(size)
+
+    def write(self, data):
+        self.__check()
+        return self.sim.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.sim, name)
+
+
+class TestReconnect(unittest.TestCase):
+    def setUp(self):
+        self.poll = daq_module.RECONNECT_POLL
+        daq_module.RECONNECT_POLL = 0.01
+        self.port = UnpluggableSerial()
+
+    def tearDown(self):
+        daq_module.RECONNECT_POLL = self.poll
+        self.daq.close()
+
+    def start(self, reconnect, **kwargs):
+        self.daq = DAQ(self.port, reconnect=reconnect)
+        s = self.daq.create_stream(ExpMode.ANALOG_IN, 1, **kwargs)
+        s.analog_setup(gain=0)
+        self.daq.start(check=None)
+        return s
+
+    def wait(self, cond, timeout=2):
+        t0 = time.time()
+        while not cond() and time.time() - t0 < timeout:
+            time.sleep(0.01)
+
+    def test_reconnect(self):
+        s = self.start(True, npoints=0, continuous=True, buffersize=20000)
+        self.wait(lambda: s.total_points > 20)
+        self.port.unplug(0.1)
+        self.wait(lambda: self.daq.stats()['reconnects'])
+        total = s.total_points
+        self.wait(lambda: s.total_points > total + 20)
+        assert self.daq.is_measuring
+        self.daq.stop()
+
+        stats = self.daq.stats()
+        assert stats['disconnects'] == 1 and stats['reconnects'] == 1
+        assert len(s.gaps) == 1 and s.gaps[0][1] >= 50
+        assert s.total_points > total + 20
+
+    def test_finite(self):
+        s = self.start(True, npoints=300)
+        self.wait(lambda: s.total_points > 20)
+        self.port.unplug(0.05)
+        self.wait(lambda: not self.daq.is_measuring)
+        self.daq.stop()
+
+        # received and lost points add up to the points of the experiment
+        assert len(s.gaps) == 1
+        assert s.total_points == 300
+        assert len(s.read()) == 300 - s.gaps[0][1]
+
+    def test_commands(self):
+        s = self.start(True, npoints=0, continuous=True)
+        self.wait(lambda: s.total_points > 20)
+        drain = daq_module.DRAIN_TIME
+        daq_module.DRAIN_TIME = 0.5     # slow down the reconnection
+        try:
+            self.port.unplug(0.05)
+            self.wait(lambda: self.daq.stats()['disconnects'])
+            time.sleep(0.2)
+            # the reader owns the device until the experiments restart
+            assert not self.daq.stats()['reconnects']
+            self.assertRaises(IOError, self.daq.set_led, LedColor.RED)
+            self.wait(lambda: self.daq.stats()['reconnects'])
+        finally:
+            daq_module.DRAIN_TIME = drain
+
+        assert self.daq.is_measuring
+        self.daq.set_led(LedColor.GREEN)
+        assert self.daq.get_info()[2] == self.port.sim.dev_id
+        self.daq.stop()
+        assert self.daq.stats()['reconnects'] == 1
+
+    def test_moved(self):
+        # the device comes back on another port node
+        ports = {'/dev/ttyUSB0': self.port,
+                 '/dev/ttyUSB1': UnpluggableSerial()}
+        ports['/dev/ttyUSB1'].unplug(10)
+
+        def probe(port, **kwargs):
+            sim = ports[port].sim
+            if time.time() < ports[port].unplugged_until:
+                return None
+            return DeviceInfo(port, sim.hw_ver, '', sim.fw_ver, sim.dev_id,
+                              sim.model.serial_str)
+
+        discovery._cache.clear()
+        boot = daq_module.BOOT_TIME
+        daq_module.BOOT_TIME = 0
+        try:
+            with mock.patch('serial.Serial', side_effect=lambda p, *a, **k:
+                            ports[p]), \
+                    mock.patch('opendaq.discovery.candidate_ports',
+                               return_value=sorted(ports)), \
+                    mock.patch('opendaq.discovery.probe', side_effect=probe):
+                self.port = '/dev/ttyUSB0'
+                s = self.start(True, npoints=0, continuous=True)
+                assert discovery.find_port(self.daq.serial_str) is None
+                self.wait(lambda: s.total_points > 20)
+
+                ports['/dev/ttyUSB0'].unplug(10)
+                ports['/dev/ttyUSB1'].unplug(0)
+                self.wait(lambda: self.daq.stats()['reconnects'])
+                total = s.total_points
+                self.wait(lambda: s.total_points > total + 20)
+                assert self.daq.stop()
+        finally:
+            daq_module.BOOT_TIME = boot
+            discovery._cache.clear()
+
+        assert self.daq.stats()['reconnects'] == 1
+        assert s.total_points > total + 20
+        assert ports['/dev/ttyUSB1'].sim.streaming is False
+        assert '/dev/ttyUSB1' in discovery._in_use
+        assert '/dev/ttyUSB0' not in discovery._in_use
+
+    def test_disconnect(self):
+        s = self.start(False, npoints=0, continuous=True)
+        self.wait(lambda: s.total_points > 20)
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter('always')
+            self.port.unplug(10)
+            self.wait(lambda: not self.daq.is_measuring)
+        assert not self.daq.is_measuring
+        assert self.daq.stats()['disconnects'] == 1
+        assert any(issubclass(x.category, RuntimeWarning) for x in w)
+        self.port.unplug(0)
+
+
+if __name__ == '__main__':
+    unittest.main()
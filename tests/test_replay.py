@@ -0,0 +1,80 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+from opendaq import DAQ, ExpMode, LedColor
+from opendaq.replay import ReplaySerial, read_records, WRITE, READ
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'session.rec')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def session(self, daq):
+        daq.set_led(LedColor.RED)
+        daq.set_pio(1, 1)
+        ret = [daq.get_info(), daq.read_pio(1), daq.read_adc()]
+
+        s = daq.create_stream(ExpMode.ANALOG_IN, 5, npoints=10)
+        s.analog_setup(gain=0)
+        daq.start(check=None)
+        t0 = time.time()
+        while daq.is_measuring and time.time() - t0 < 2:
+            time.sleep(0.01)
+        daq.stop()
+        ret.append(s.read())
+        daq.close()
+        return ret
+
+    def test_record_replay(self):
+        recorded = self.session(DAQ('sim', record=self.path))
+
+        records = read_records(self.path)
+        assert records[0][0] == WRITE
+        assert set(r[0] for r in records) == set([WRITE, READ])
+        assert all(a[1] <= b[1] for a, b in zip(records, records[1:]))
+
+        replay = ReplaySerial(self.path)
+        assert self.session(DAQ(replay)) == recorded
+        assert replay.exhausted
+        assert len(recorded[-1]) == 10
+
+    def test_bench(self):
+        from opendaq import bench
+        self.session(DAQ('sim', record=self.path))
+        results = bench.run(['recording'], number=1, repeat=1,
+                            recording=self.path)
+        assert list(results) == ['recording']
+        assert results['recording']['items'] > 0
+
+    def test_flush(self):
+        daq = DAQ('sim', record=self.path)
+        nrecords = len(read_records(self.path))
+        daq.set_led(LedColor.RED)
+        records = read_records(self.path)
+        assert [r[0] for r in records[nrecords:]] == [WRITE, READ]
+        daq.close()
+
+    def test_divergence(self):
+        daq = DAQ('sim', record=self.path)
+        daq.set_led(LedColor.RED)
+        daq.close()
+
+        daq = DAQ(ReplaySerial(self.path))
+        with self.assertRaises(IOError):
+            daq.set_led(LedColor.ORANGE)
+
+    def test_not_recording(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a recording')
+        with self.assertRaises(ValueError):
+            ReplaySerial(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,263 @@
+import time
+import unittest
+import serial
+import numpy as np
+from opendaq import DAQ, ExpMode, LedColor
+from opendaq import daq as daq_module
+from opendaq.common import LengthError
+from opendaq.simulator import DAQSimulator, DC, Sine, Square, Ramp, \
+    DACLoopback
+from opendaq.common import mkcmd
+from opendaq.stream import StreamParser
+
+
+class TestSimulatorStream(unittest.TestCase):
+    def setUp(self):
+        self.daq = DAQ('sim')
+        self.sim = self.daq.ser
+
+    def tearDown(self):
+        self.daq.close()
+
+    def reopen(self, **kwargs):
+        self.daq.close()
+        self.daq = DAQ('sim', **kwargs)
+        self.sim = self.daq.ser
+
+    def create_stream(self, *args, **kwargs):
+        s = self.daq.create_stream(ExpMode.ANALOG_IN, *args, **kwargs)
+        s.analog_setup(gain=0)
+        return s
+
+    def test_real_time(self):
+        s = self.create_stream(5, npoints=10)
+        t0 = time.time()
+        self.daq.start()
+        while self.daq.is_measuring and time.time() - t0 < 2:
+            time.sleep(0.01)
+        assert not self.daq.is_measuring
+        assert len(s.read()) == 10
+        assert time.time() - t0 >= 0.05
+
+    def test_virtual_clock(self):
+        self.reopen(virtual_clock=True)
+        s1 = self.create_stream(1, npoints=0, continuous=True,
+                                buffersize=20000)
+        s2 = self.create_stream(100, npoints=600)
+        self.daq.start(check=None)
+        while self.daq.is_measuring and s2.total_points < 600:
+            time.sleep(0.01)
+        self.daq.stop()
+
+        # one minute of simulated time
+        assert s2.total_points == 600
+        assert s1.total_points >= 60000
+        assert self.sim.clock >= 60e6
+
+    def test_multiprocess(self):
+        daq = DAQ('sim', multiprocess=True, virtual_clock=True)
+        try:
+            daq.ser.set_source(1, DC(1.5))
+            s = daq.create_stream(ExpMode.ANALOG_IN, 1, npoints=100)
+            s.analog_setup(gain=0)
+            daq.start(check=None)
+            t0 = time.time()
+            while daq.is_measuring and time.time() - t0 < 2:
+                time.sleep(0.01)
+            assert daq.stop()
+            values = s.read()
+            assert len(values) == 100
+            assert np.allclose(values, 1.5, atol=1e-2)
+        finally:
+            daq.close()
+
+    def test_deterministic(self):
+        def run():
+            sim = DAQSimulator('sim', virtual_clock=True)
+            sim.write(mkcmd(21, 'H', 500) + mkcmd(32, 'BHb', 1, 10, 1) +
+                      mkcmd(19, 'BH', 2, 1) + mkcmd(32, 'BHb', 2, 3, 1) +
+                      mkcmd(64, ''))
+            sim.read(sim.in_waiting)
+            return sim.read(sim.in_waiting)
+
+        data = run()
+        assert data == run()
+        # DataChannel 2 finishes first (3 ms), the burst after 5 ms
+        packets = StreamParser().feed(data)
+        assert packets[-2:] == [(2, None), (1, None)]
+        assert sum(len(v) for ch, v in packets if ch == 1 and v) == 10
+
+    def test_commands_while_streaming(self):
+        self.reopen(virtual_clock=True)
+        self.create_stream(1, npoints=0, continuous=True)
+        self.daq.start(check=None)
+        for i in range(20):
+            self.daq.set_port(i % 64)
+            assert self.daq.read_port() == i % 64
+        ret = self.daq.send_commands([(mkcmd(3, 'B', 1), 'BB')]*10)
+        assert ret == [(1, 1)]*10
+        assert self.daq.stop()
+        assert not self.daq.is_measuring
+
+    def test_lost_response(self):
+        self.reopen(virtual_clock=True)
+        self.create_stream(1, npoints=0, continuous=True)
+        self.daq.start(check=None)
+        self.daq.set_pio(1, 1)
+
+        # the device misses one command
+        write = self.sim.write
+        self.sim.write = lambda data: len(data)
+        timeout = daq_module.COMMAND_TIMEOUT
+        daq_module.COMMAND_TIMEOUT = 0.1
+        try:
+            self.assertRaises(LengthError, self.daq.read_pio, 1)
+        finally:
+            self.sim.write = write
+            daq_module.COMMAND_TIMEOUT = timeout
+
+        for i in range(5):
+            assert self.daq.read_pio(1) == 1
+        assert self.daq.stats()['length_errors'] == 1
+        assert self.daq.stop()
+
+    def test_stop_timeout(self):
+        self.create_stream(1, npoints=0, continuous=True)
+        self.daq.start(check=None)
+        time.sleep(0.05)
+
+        # the device does not answer to STREAM_STOP
+        read = self.sim.read
+        self.sim.read = lambda size=1: time.sleep(0.01) or b''
+        t0 = time.time()
+        assert not self.daq.stop(timeout=0.2)
+        assert time.time() - t0 < 1
+        assert not self.daq.is_measuring
+
+        # the device can be used again
+        self.sim.read = read
+        self.daq.flush()
+        assert self.daq.get_info()[2] == self.sim.dev_id
+
+    def test_stop_lost_device(self):
+        self.reopen(shadow=True)
+        self.daq.set_led(LedColor.RED)
+        self.create_stream(1, npoints=0, continuous=True)
+        self.daq.start(check=None)
+        time.sleep(0.05)
+
+        # the port fails once the device is gone
+        def lost(*args):
+            raise serial.SerialException("device disconnected")
+
+        read, write = self.sim.read, self.sim.write
+        self.sim.read = lambda size=1: time.sleep(0.01) or b''
+        self.sim.write = self.sim.flushInput = lost
+        t0 = time.time()
+        assert not self.daq.stop(timeout=0.2)
+        assert time.time() - t0 < 1
+        assert not self.daq.is_measuring
+
+        # the shadow state was forgotten
+        self.sim.read, self.sim.write = read, write
+        del self.sim.flushInput
+        self.sim.cmd_stream_stop()
+        self.daq.flush()
+        commands = self.daq.stats()['commands']
+        self.daq.set_led(LedColor.RED)
+        assert self.daq.stats()['commands'] == commands + 1
+
+    def test_lost_stop(self):
+        self.reopen(shadow=True)
+        self.daq.set_led(LedColor.RED)
+        s = self.create_stream(1, npoints=0, continuous=True)
+        self.daq.start(check=None)
+        time.sleep(0.05)
+
+        # the first STREAM_STOP is lost
+        write = self.sim.write
+        stop = mkcmd(daq_module.CMD.STREAM_STOP, '')
+        lost = []
+
+        def drop_stop(data):
+            if bytes(data) == bytes(stop) and not lost:
+                lost.append(data)
+                return len(data)
+            return write(data)
+        self.sim.write = drop_stop
+
+        assert not self.daq.stop(timeout=0.5)
+        assert lost and not self.daq.is_measuring
+        assert self.daq.get_info()[2] == self.sim.dev_id
+        # the settings are sent again
+        commands = self.daq.stats()['commands']
+        self.daq.set_led(LedColor.RED)
+        assert self.daq.stats()['commands'] == commands + 1
+
+        total = s.total_points
+        self.daq.start(check=None)
+        time.sleep(0.05)
+        assert self.daq.stop()
+        assert s.total_points > total + 10
+
+
+class TestSimulatorSignals(unittest.TestCase):
+    def setUp(self):
+        self.daq = DAQ('sim', virtual_clock=True)
+        self.sim = self.daq.ser
+
+    def tearDown(self):
+        self.daq.close()
+
+    def test_dc(self):
+        self.sim.set_source(1, DC(1.234))
+        self.sim.set_source(2, DC(-0.5))
+        self.daq.conf_adc(1, 0, 0, 10)
+        assert abs(self.daq.read_analog() - 1.234) < 1e-3
+
+        # differential input
+        self.daq.conf_adc(1, 2, 1, 10)
+        assert abs(self.daq.read_analog() - 1.734) < 1e-3
+
+        values = self.daq.read_all(gain=0)
+        assert abs(values[0] - 1.234) < 1e-3 and abs(values[1] + .5) < 1e-3
+
+    def test_dac_loopback(self):
+        self.sim.set_source(3, DACLoopback())
+        self.daq.conf_adc(3, 0, 0, 1)
+        for volts in (0.5, 2., 3.5):
+            self.daq.set_analog(volts)
+            assert abs(self.daq.read_analog() - volts) < 2e-3
+
+    def test_streamed_loopback(self):
+        self.sim.set_source(3, DACLoopback())
+        s = self.daq.create_stream(ExpMode.ANALOG_IN, 1, npoints=200)
+        s.analog_setup(pinput=3, gain=0, nsamples=1)
+        out = self.daq.create_stream(ExpMode.ANALOG_OUT, 1, npoints=200)
+        out.load_signal([0.5, 1., 1.5, 2.])
+        self.daq.start(check=None)
+        while self.daq.is_measuring:
+            time.sleep(0.01)
+
+        # the input follows the streamed waveform
+        levels = set(np.round(s.read(), 2))
+        assert len(levels) > 1 and levels <= {0.5, 1., 1.5, 2.}
+
+    def test_waveforms(self):
+        t = np.linspace(0, 1, 1001)
+        assert np.allclose(Sine(2., 5.)(self.sim, t),
+                           2*np.sin(2*np.pi*5*t))
+        assert set(Square(1., 2., offset=1.)(self.sim, t)) == {0., 2.}
+        ramp = Ramp(1., 1.)(self.sim, t[:-1])
+        assert ramp[0] == -1 and np.all(np.diff(ramp) > 0)
+
+    def test_stream(self):
+        self.sim.set_source(4, Sine(1., 10.))
+        s = self.daq.create_stream(ExpMode.ANALOG_IN, 1, npoints=200)
+        s.analog_setup(pinput=4, gain=0, nsamples=1)
+        self.daq.start(check=None)
+        while self.daq.is_measuring:
+            time.sleep(0.01)
+
+        t = np.arange(1, 201)*1e-3
+        assert np.allclose(s.read(), np.sin(2*np.pi*10*t), atol=1e-3)
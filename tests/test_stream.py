@@ -0,0 +1,108 @@
+import unittest
+from opendaq.common import mkcmd, NAK
+from opendaq.stream import StreamParser, stream_packet
+from opendaq.shm import SharedRing
+
+
+class TestStreamParser(unittest.TestCase):
+    def test_packets(self):
+        data = (b'\x00\x12' + stream_packet(1, [1, -2, 3]) +
+                stream_packet(2, [0x7e7d, 0x207e]) + stream_packet(1))
+        parser = StreamParser()
+        assert parser.feed(data) == [(1, (1, -2, 3)), (2, (0x7e7d, 0x207e)),
+                                     (1, None)]
+
+    def test_split(self):
+        data = stream_packet(3, [0x7d7e, 5]) * 2
+        parser = StreamParser()
+        packets = []
+        for i in range(len(data)):
+            packets += parser.feed(data[i:i + 1])
+        assert packets == [(3, (0x7d7e, 5))] * 2
+
+    def test_invalid_command(self):
+        parser = StreamParser()
+        data = bytearray([0x7e, 0, 0, 99, 1, 1]) + stream_packet(1, [7])
+        assert parser.feed(data) == [(1, (7,))]
+        assert parser.errors == 1
+
+    def test_responses(self):
+        reply = mkcmd(3, 'BB', 1, 0)
+        data = (stream_packet(1, [4]) + reply + stream_packet(1, [5]) + NAK +
+                stream_packet(1))
+        parser = StreamParser()
+        parser.expect(len(reply))
+        parser.expect(len(reply))
+        packets = []
+        for i in range(len(data)):
+            packets += parser.feed(data[i:i + 1])
+        assert packets == [(1, (4,)), (1, (5,)), (1, None)]
+        assert list(parser.responses) == [reply, NAK]
+
+
+class TestSharedRing(unittest.TestCase):
+    def setUp(self):
+        self.ring = SharedRing(8)
+
+    def tearDown(self):
+        self.ring.close(unlink=True)
+
+    def test_read_write(self):
+        self.ring.write([1, 2, 3])
+        lost, data = self.ring.read()
+        assert lost == 0 and list(data) == [1, 2, 3]
+
+        self.ring.write(range(4, 11))
+        lost, data = self.ring.read()
+        assert lost == 0 and list(data) == list(range(4, 11))
+
+    def test_overflow(self):
+        self.ring.write(range(5))
+        self.ring.write(range(5, 20))
+        lost, data = self.ring.read()
+        assert lost == 12 and list(data) == list(range(12, 20))
+
+    def test_write_in_progress(self):
+        self.ring.write(range(8))
+        # the producer is overwriting the first half, not yet published
+        self.ring.header[2] += 4
+        self.ring.data[:4] = -1
+        lost, data = self.ring.read()
+        assert lost == 4 and list(data) == [4, 5, 6, 7]
+
+    def test_attach(self):
+        other = SharedRing(8, name=self.ring.name)
+        other.write([-5])
+        other.stop()
+        assert list(self.ring.read()[1]) == [-5]
+        assert self.ring.stopped
+        other.close()
+
+
+class FakeSerial(object):
+    def __init__(self, data):
+        self.data = bytearray(data)
+
+    @property
+    def in_waiting(self):
+        return len(self.data)
+
+    def read(self, size=1):
+        ret, self.data = self.data[:size], self.data[size:]
+        return bytes(ret)
+
+
+class TestStreamProcess(unittest.TestCase):
+    def test_read_stream_process(self):
+        from opendaq.daq import _read_stream_process
+        rings = {1: SharedRing(16), 2: SharedRing(16)}
+        ser = FakeSerial(stream_packet(1, [1, 2]) + stream_packet(2, [3]) +
+                         stream_packet(1, [4]) + stream_packet(1) +
+                         stream_packet(2))
+        _read_stream_process(ser, rings)
+
+        assert list(rings[1].read()[1]) == [1, 2, 4]
+        assert list(rings[2].read()[1]) == [3]
+        for ring in rings.values():
+            assert ring.stopped
+            ring.close(unlink=True)
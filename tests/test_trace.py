@@ -0,0 +1,55 @@
+import unittest
+from opendaq import DAQ
+from opendaq.common import mkcmd
+from opendaq.trace import TraceRing, TraceKind
+
+
+class TestTraceRing(unittest.TestCase):
+    def test_record(self):
+        ring = TraceRing(size=16, nframes=4)
+        ring.on_send(b'abc')
+        ring.on_recv(b'defg')
+        frames = ring.dump()
+        assert [(k, d) for _, k, d in frames] == [(TraceKind.SEND, b'abc'),
+                                                  (TraceKind.RECV, b'defg')]
+        assert frames[0][0] <= frames[1][0]
+
+    def test_overwrite(self):
+        ring = TraceRing(size=16, nframes=4)
+        for i in range(6):
+            ring.on_stream_packet(bytes(bytearray([i])*5))
+        # the byte buffer holds the last 3 frames (one of them wrapped)
+        assert [d for _, _, d in ring.dump()] == [
+            bytes(bytearray([i])*5) for i in (3, 4, 5)]
+
+        ring.on_send(b'x'*20)
+        assert [d for _, _, d in ring.dump()] == [b'x'*16]
+
+    def test_threads(self):
+        from threading import Thread
+        ring = TraceRing(size=1 << 16, nframes=1 << 12)
+
+        def record(c):
+            for _ in range(1000):
+                ring.on_send(c*4)
+        threads = [Thread(target=record, args=(c,)) for c in (b'a', b'b')]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert ring.count == 2000 and ring.nbytes == 8000
+        assert set(d for _, _, d in ring.dump()) == {b'aaaa', b'bbbb'}
+
+    def test_daq(self):
+        ring = TraceRing()
+        daq = DAQ('sim', trace=ring)
+        daq.set_pio(1, 1)
+        frames = ring.dump()
+        assert frames[-2][1:] == (TraceKind.SEND, bytes(mkcmd(3, 'BB', 1, 1)))
+        assert frames[-1][1:] == (TraceKind.RECV, bytes(mkcmd(3, 'BB', 1, 1)))
+
+        daq.set_trace(None)
+        daq.set_pio(1, 0)
+        assert len(ring.dump()) == len(frames)
+        daq.close()
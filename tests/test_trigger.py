@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+from opendaq.trigger import SoftTrigger, TriggerCondition
+
+
+class TestSoftTrigger(unittest.TestCase):
+    def test_rising_edge(self):
+        trg = SoftTrigger(1., TriggerCondition.RISING, hysteresis=.5,
+                          pre=2, post=3, nsegments=4)
+        x = [0, 0, 2, 2, 2, 1.2, 0.8, 2, 0.4, 3, 3, 3]
+        assert trg.process(x) == 2
+        pos, seg = trg.read()
+        assert list(pos) == [2, 9]
+        assert list(seg[0]) == [0, 0, 2, 2, 2]
+        assert list(seg[1]) == [2, 0.4, 3, 3, 3]
+
+    def test_falling_edge(self):
+        trg = SoftTrigger(0., TriggerCondition.FALLING, pre=1, post=2,
+                          nsegments=2)
+        trg.process([1, 1, -1, -1, 1, -1, 0.5])
+        pos, seg = trg.read()
+        assert list(pos) == [2, 5]
+        assert list(seg[1]) == [1, -1, 0.5]
+        assert trg.is_full
+
+    def test_split_blocks(self):
+        trg = SoftTrigger(1., pre=3, post=4, nsegments=1)
+        trg.process([0, 0.5])
+        trg.process([2, 3])
+        assert trg.count == 0
+        trg.process([4, 5, 6])
+        pos, seg = trg.read()
+        assert list(pos) == [2]
+        assert np.isnan(seg[0, 0])
+        assert list(seg[0, 1:]) == [0, 0.5, 2, 3, 4, 5]
+
+    def test_level(self):
+        trg = SoftTrigger(1., TriggerCondition.ABOVE, post=2, nsegments=10)
+        trg.process([0, 1, 1, 1, 1, 1, 0])
+        assert list(trg.read()[0]) == [1, 3, 5]
+        assert trg.count == 3
+
+    def test_errors(self):
+        self.assertRaises(ValueError, SoftTrigger, 0, 1)
+        self.assertRaises(ValueError, SoftTrigger, 0, hysteresis=-1)
+        self.assertRaises(ValueError, SoftTrigger, 0, post=0)
+        self.assertRaises(ValueError, SoftTrigger, 0, nsegments=0)